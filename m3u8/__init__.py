@@ -3,84 +3,209 @@
 # Use of this source code is governed by a MIT License
 # license that can be found in the LICENSE file.
 
+import fnmatch
+import mmap
+import multiprocessing
 import sys
 import os
-import posixpath
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from urllib.request import urlopen, Request
     from urllib.error import HTTPError
-    from urllib.parse import urlparse, urljoin
 except ImportError:  # Python 2.x
     from urllib2 import urlopen, Request, HTTPError
-    from urlparse import urlparse, urljoin
 
 from m3u8.model import M3U8, Playlist, IFramePlaylist, Media, Segment
-from m3u8.parser import parse, is_url, ParseError
+from m3u8.loader import Loader, RetryPolicy, RateLimiter, _parsed_url, _read_content, _with_accept_encoding
+from m3u8.parser import parse, parse_header, iterparse, is_url, ParseError
+from m3u8.watcher import LivePlaylistWatcher
 
 PYTHON_MAJOR_VERSION = sys.version_info
 
 __all__ = ('M3U8', 'Playlist', 'IFramePlaylist', 'Media',
-           'Segment', 'loads', 'load', 'parse', 'ParseError')
+           'Segment', 'loads', 'loads_header', 'load', 'parse', 'iterparse',
+           'ParseError', 'Loader', 'RetryPolicy', 'RateLimiter', 'resolve',
+           'load_directory', 'LivePlaylistWatcher')
 
+if PYTHON_MAJOR_VERSION >= (3, 5):
+    from m3u8.aio import async_load, load_many
+    __all__ += ('async_load', 'load_many')
 
-def loads(content):
+
+def loads(content, lazy=False, last_segments=None, columnar=False):
     '''
     Given a string with a m3u8 content, returns a M3U8 object.
+    If `lazy` is True segments are only created when accessed.
+    If `last_segments` is given only the last `last_segments` segments
+    are parsed.
+    If `columnar` is True segments are stored in a `ColumnarSegmentList`.
     Raises ValueError if invalid content
     '''
-    return M3U8(content)
+    return M3U8(content, lazy=lazy, last_segments=last_segments, columnar=columnar)
+
+
+def loads_header(content):
+    '''
+    Given a string with a m3u8 content, returns a dictionary with only the
+    playlist level data: `targetduration`, `media_sequence`, `playlist_type`,
+    `is_endlist`, `is_variant`, `segment_count` and `total_duration`.
+    Much cheaper than `loads` when checking a live playlist for staleness.
+    '''
+    return parse_header(content)
 
 
-def load(uri, timeout=None, headers={}):
+def load(uri, timeout=None, headers={}, loader=None):
     '''
     Retrieves the content from a given URI and returns a M3U8 object.
+    If a `Loader` is given URIs are fetched through its persistent
+    connections.
     Raises ValueError if invalid content or IOError if request fails.
     Raises socket.timeout(python 2.7+) or urllib2.URLError(python 2.6) if
     timeout happens when loading from uri
     '''
     if is_url(uri):
+        if loader is not None:
+            return loader.load(uri, timeout, headers)
         return _load_from_uri(uri, timeout, headers)
     else:
         return _load_from_file(uri)
 
-# Support for python3 inspired by https://github.com/szemtiv/m3u8/
-
-
-def _load_from_uri(uri, timeout=None, headers={}):
-    request = Request(uri, headers=headers)
-    resource = urlopen(request, timeout=timeout)
-    base_uri = _parsed_url(_url_for(request))
-    if PYTHON_MAJOR_VERSION < (3,):
-        content = _read_python2x(resource)
-    else:
-        content = _read_python3x(resource)
-    return M3U8(content, base_uri=base_uri)
-
-
-def _url_for(request):
-    return urlopen(request).geturl()
 
+def resolve(master, concurrency=8, timeout=None, headers={}, loader=None,
+            return_exceptions=False):
+    '''
+    Loads every playlist referenced by a master playlist (variants, I-frame
+    playlists and alternative renditions) using `concurrency` threads, and
+    sets the `media_playlist` attribute of each Playlist, IFramePlaylist and
+    Media to the M3U8 object loaded. Master playlists found among them are
+    resolved as well.
+    `master` is a M3U8 object or the URI of one, which is loaded first.
+    URIs are fetched through `loader`, or a new `Loader` if None.
+    If `return_exceptions` is True the error is set in place of the
+    playlists that could not be loaded, otherwise the first one is raised.
+    Returns the master M3U8 object.
+    '''
+    own_loader = loader is None
+    if own_loader:
+        loader = Loader()
+    try:
+        if not isinstance(master, M3U8):
+            master = load(master, timeout, headers, loader)
+        with ThreadPoolExecutor(concurrency) as executor:
+            _resolve(master, executor, timeout, headers, loader, return_exceptions)
+    finally:
+        if own_loader:
+            loader.close()
+    return master
+
+
+def _resolve(master, executor, timeout, headers, loader, return_exceptions):
+    futures = {}
+    masters = [master]
+    while masters:
+        references = []
+        for playlist in masters:
+            for reference in _references(playlist):
+                uri = reference.absolute_uri
+                if uri not in futures:
+                    futures[uri] = executor.submit(load, uri, timeout, headers, loader)
+                    references.append((reference, uri, True))
+                else:
+                    references.append((reference, uri, False))
+
+        masters = []
+        for reference, uri, first in references:
+            try:
+                reference.media_playlist = futures[uri].result()
+            except Exception as error:
+                if not return_exceptions:
+                    for future in futures.values():
+                        future.cancel()
+                    raise
+                reference.media_playlist = error
+                continue
+            # a playlist seen before was already resolved, or is being
+            # resolved at this level (which also avoids cycles)
+            if first and reference.media_playlist.is_variant:
+                masters.append(reference.media_playlist)
+
+
+def _references(playlist):
+    for variant in playlist.playlists:
+        yield variant
+    for iframe_playlist in playlist.iframe_playlists:
+        yield iframe_playlist
+    for media in playlist.media:
+        if media.uri:
+            yield media
+
+def load_directory(root, pattern='*.m3u8', workers=None, summary=False, chunksize=8):
+    '''
+    Walks the directory tree under `root` and loads every file whose name
+    matches `pattern` in a pool of `workers` processes (one per CPU if None,
+    none at all if 1), yielding `(path, M3U8 object)` tuples as soon as the
+    files are parsed, in no particular order.
 
-def _parsed_url(url):
-    parsed_url = urlparse(url)
-    prefix = parsed_url.scheme + '://' + parsed_url.netloc
-    base_path = posixpath.normpath(parsed_url.path + '/..')
-    return urljoin(prefix, base_path)
+    If `summary` is True only the playlist level data is parsed and the
+    dictionaries `loads_header` returns are yielded instead of M3U8 objects,
+    which are much cheaper to send back from the workers.
 
+    Files that can not be read or parsed are yielded with the exception
+    raised in place of the result.
+    '''
+    tasks = ((path, summary) for path in _walk(root, pattern))
+    if workers == 1:
+        for task in tasks:
+            yield _load_directory_entry(task)
+        return
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        for result in pool.imap_unordered(_load_directory_entry, tasks, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _walk(root, pattern):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(fnmatch.filter(filenames, pattern)):
+            yield os.path.join(dirpath, filename)
+
+
+def _load_directory_entry(task):
+    path, summary = task
+    try:
+        if summary:
+            with open(path, 'rb') as fileobj:
+                return path, parse_header(fileobj.read().decode('utf-8'))
+        return path, _load_from_file(path)
+    except Exception as error:
+        return path, error
 
-def _read_python2x(resource):
-    return resource.read().strip()
+# Support for python3 inspired by https://github.com/szemtiv/m3u8/
 
 
-def _read_python3x(resource):
-    return resource.read().decode(
-        resource.headers.get_content_charset(failobj="utf-8")
-    )
+def _load_from_uri(uri, timeout=None, headers={}):
+    request = Request(uri, headers=_with_accept_encoding(headers))
+    resource = urlopen(request, timeout=timeout)
+    base_uri = _parsed_url(resource.geturl())
+    return M3U8(_read_content(resource, resource.info()), base_uri=base_uri)
 
 
 def _load_from_file(uri):
-    with open(uri) as fileobj:
-        raw_content = fileobj.read().strip()
-    base_uri = os.path.dirname(uri)
-    return M3U8(raw_content, base_uri=base_uri)
+    # the parser decodes the lines straight from the mapped file, instead
+    # of reading, decoding and then splitting a copy of the whole content
+    with open(uri, 'rb') as fileobj:
+        try:
+            content = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty files can not be mapped
+            return M3U8('', base_uri=os.path.dirname(uri))
+        try:
+            return M3U8(content, base_uri=os.path.dirname(uri))
+        finally:
+            content.close()
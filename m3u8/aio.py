@@ -0,0 +1,171 @@
+# coding: utf-8
+# Copyright 2014 Globo.com Player authors. All rights reserved.
+# Use of this source code is governed by a MIT License
+# license that can be found in the LICENSE file.
+
+'''
+Asyncio versions of `m3u8.load`, for monitoring many streams from a single
+thread. Requires python 3.5+, the names are exported by the `m3u8` package
+when available.
+'''
+
+import asyncio
+import functools
+import io
+from http.client import parse_headers
+from urllib.error import HTTPError
+from urllib.parse import urlparse, urljoin
+
+from m3u8.model import M3U8
+from m3u8.parser import is_url
+from m3u8.loader import (CHUNK_SIZE, REDIRECT_STATUSES, _decode, _decompressor, _parsed_url,
+                         _with_accept_encoding)
+
+
+async def async_load(uri, timeout=None, headers=None, executor=None, max_redirects=10):
+    '''
+    Retrieves the content from a given URI and returns a M3U8 object,
+    like `m3u8.load`, without blocking the event loop: the playlist is
+    fetched with asyncio streams and parsed in `executor` (the loop's
+    default executor if None).
+    Raises ValueError if invalid content, IOError if request fails or
+    asyncio.TimeoutError if `timeout` seconds pass before the response
+    is read.
+    '''
+    # get_running_loop() is new in python 3.7
+    loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)()
+    if not is_url(uri):
+        from m3u8 import _load_from_file
+        return await loop.run_in_executor(executor, _load_from_file, uri)
+
+    url, message, body = await asyncio.wait_for(
+        _fetch(uri, _with_accept_encoding(headers), max_redirects), timeout)
+    return await loop.run_in_executor(
+        executor, functools.partial(M3U8, _decode(message, body), base_uri=_parsed_url(url)))
+
+
+async def load_many(uris, concurrency=10, timeout=None, headers=None, executor=None,
+                    return_exceptions=False):
+    '''
+    Loads every uri in `uris` with `async_load`, at most `concurrency` at a
+    time, and returns the M3U8 objects in the same order.
+    If `return_exceptions` is True errors are returned in place of the
+    playlists that failed, otherwise the first error is raised.
+    '''
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded_load(uri):
+        async with semaphore:
+            return await async_load(uri, timeout, headers, executor)
+
+    return await asyncio.gather(*[bounded_load(uri) for uri in uris],
+                                return_exceptions=return_exceptions)
+
+
+async def _fetch(uri, headers, max_redirects):
+    url = uri
+    for _ in range(max_redirects + 1):
+        status, reason, message, body = await _request(url, headers)
+        if status not in REDIRECT_STATUSES:
+            break
+        if message['Location'] is None:
+            raise HTTPError(url, status, 'Redirect without Location', message, None)
+        url = urljoin(url, message['Location'])
+    else:
+        raise HTTPError(url, status, 'Too many redirects', message, None)
+
+    if status >= 400:
+        raise HTTPError(url, status, reason, message, None)
+    return url, message, body
+
+
+async def _request(url, headers):
+    parsed_url = urlparse(url)
+    secure = parsed_url.scheme == 'https'
+    port = parsed_url.port or (443 if secure else 80)
+    path = parsed_url.path or '/'
+    if parsed_url.query:
+        path += '?' + parsed_url.query
+
+    request_headers = {'Host': parsed_url.netloc}
+    request_headers.update(headers)
+    request_headers['Connection'] = 'close'
+    request = ['GET %s HTTP/1.1' % path]
+    request.extend('%s: %s' % header for header in request_headers.items())
+
+    reader, writer = await asyncio.open_connection(parsed_url.hostname, port, ssl=secure or None)
+    try:
+        writer.write(('\r\n'.join(request) + '\r\n\r\n').encode('latin-1'))
+        while True:
+            status, reason, message = await _read_head(reader, url)
+            # interim responses (100 Continue, 103 Early Hints) come before
+            # the final one, without a body
+            if not 100 <= status < 200:
+                break
+
+        decompressor = _decompressor(message.get('Content-Encoding'))
+        if status in (204, 304):
+            body = b''
+        elif message.get('Transfer-Encoding', '').lower() == 'chunked':
+            body = await _read_chunked(reader, decompressor)
+        else:
+            length = message.get('Content-Length')
+            body = await _read_body(reader, decompressor, int(length) if length else None)
+        return status, reason, message, body
+    finally:
+        writer.close()
+        if hasattr(writer, 'wait_closed'):
+            # python 3.7+, the transport is only released once closed
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def _read_head(reader, url):
+    # status, reason and headers of a response
+    status_line = (await reader.readline()).decode('latin-1').rstrip('\r\n').split(' ', 2)
+    if len(status_line) < 2 or not status_line[1].isdigit():
+        raise HTTPError(url, 0, 'Invalid status line', None, None)
+    status = int(status_line[1])
+    reason = status_line[2] if len(status_line) > 2 else ''
+
+    header_lines = []
+    while True:
+        line = await reader.readline()
+        header_lines.append(line)
+        if line in (b'\r\n', b'\n', b''):
+            break
+    return status, reason, parse_headers(io.BytesIO(b''.join(header_lines)))
+
+
+async def _read_body(reader, decompressor, length):
+    # like `m3u8.loader._read_body`, decompressing the body as it is read,
+    # up to `length` bytes or the end of the stream if None
+    chunks = []
+    while length is None or length > 0:
+        if length is None:
+            chunk = await reader.read(CHUNK_SIZE)
+            if not chunk:
+                break
+        else:
+            chunk = await reader.readexactly(min(CHUNK_SIZE, length))
+            length -= len(chunk)
+        chunks.append(decompressor.decompress(chunk))
+    chunks.append(decompressor.flush())
+    return b''.join(chunks)
+
+
+async def _read_chunked(reader, decompressor):
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b';', 1)[0], 16)
+        if size == 0:
+            break
+        chunks.append(decompressor.decompress(await reader.readexactly(size)))
+        await reader.readline()
+    # trailers
+    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+        pass
+    chunks.append(decompressor.flush())
+    return b''.join(chunks)
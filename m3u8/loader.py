@@ -0,0 +1,403 @@
+# coding: utf-8
+# Copyright 2014 Globo.com Player authors. All rights reserved.
+# Use of this source code is governed by a MIT License
+# license that can be found in the LICENSE file.
+
+import posixpath
+import random
+import socket
+import sys
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+try:
+    from http.client import HTTPConnection, HTTPSConnection, HTTPException
+    from urllib.error import HTTPError
+    from urllib.parse import urlparse, urljoin
+except ImportError:  # Python 2.x
+    from httplib import HTTPConnection, HTTPSConnection, HTTPException
+    from urllib2 import HTTPError
+    from urlparse import urlparse, urljoin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from m3u8.model import M3U8
+
+PYTHON_MAJOR_VERSION = sys.version_info
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+
+CHUNK_SIZE = 64 * 1024
+
+CachedPlaylist = namedtuple('CachedPlaylist', ['etag', 'last_modified', 'playlist'])
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class RetryPolicy(object):
+    '''
+    Tells a `Loader` which failed requests to retry, and how long to wait
+    before each retry.
+
+    Connection errors, timeouts and responses with one of the `statuses`
+    are retried up to `retries` times. Before retry number `n` (from 0)
+    the loader waits `backoff * 2 ** n` seconds, at most `max_backoff`, or
+    longer if the server sent a `Retry-After` header. With `jitter` the wait
+    is a random time up to that value instead, so clients that failed
+    together do not retry together.
+    '''
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30, jitter=True,
+                 statuses=(429, 500, 502, 503, 504)):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = statuses
+
+    def should_retry(self, error, attempt):
+        if attempt >= self.retries:
+            return False
+        if isinstance(error, HTTPError):
+            return error.code in self.statuses
+        return isinstance(error, (socket.error, HTTPException))
+
+    def delay(self, error, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+
+class RateLimiter(object):
+    '''
+    Token bucket limiting the requests of a `Loader` to `rate` per second
+    to each host, allowing bursts of up to `burst` requests.
+    `acquire` blocks until the next request to a host is allowed.
+    '''
+
+    def __init__(self, rate, burst=1, clock=_clock, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        with self._lock:
+            now = self._clock()
+            tokens, last = self._buckets.get(host, (self.burst, now))
+            # waiting requests take their token in advance, leaving the
+            # bucket negative
+            tokens = min(self.burst, tokens + (now - last) * self.rate) - 1
+            self._buckets[host] = (tokens, now)
+        if tokens < 0:
+            self._sleep(-tokens / self.rate)
+
+
+class Loader(object):
+    '''
+    Fetches playlists over HTTP keeping connections open between requests,
+    so polling the same hosts does not pay a TCP (and TLS) handshake on
+    every reload.
+
+    `timeout` and `headers` are used for every request, `load` and `fetch`
+    can override the timeout and add headers. A loader can be shared among
+    threads; close it (or use it as a context manager) to close the idle
+    connections.
+
+        with m3u8.Loader(timeout=5) as loader:
+            master = m3u8.load('http://videoserver.com/master.m3u8', loader=loader)
+
+    If `cache` is True the `ETag` and `Last-Modified` of every playlist
+    loaded are remembered and sent back on the next load of the same uri;
+    when the server answers 304 (Not Modified) the M3U8 object returned
+    before is returned again, without downloading or parsing the playlist.
+
+    Failed requests are retried as `retry`, a `RetryPolicy`, says, and
+    `rate_limiter`, a `RateLimiter`, throttles the requests to each host.
+
+        loader = m3u8.Loader(retry=m3u8.RetryPolicy(retries=5),
+                             rate_limiter=m3u8.RateLimiter(rate=10, burst=20))
+    '''
+
+    def __init__(self, timeout=None, headers=None, max_redirects=10, cache=False,
+                 retry=None, rate_limiter=None):
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.max_redirects = max_redirects
+        self.cache = cache
+        self.retry = retry
+        self.rate_limiter = rate_limiter
+        self._cached_playlists = {}
+        self._idle_connections = {}
+        self._lock = threading.Lock()
+
+    def load(self, uri, timeout=None, headers=None):
+        '''
+        Returns a M3U8 object with the content of `uri`.
+        Raises HTTPError if the server answers with an error.
+        '''
+        cached = self._cached_playlists.get(uri) if self.cache else None
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached.etag:
+                request_headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                request_headers['If-Modified-Since'] = cached.last_modified
+
+        url, response, body = self._fetch(uri, timeout, request_headers)
+        if response.status == 304 and cached is not None:
+            return cached.playlist
+
+        playlist = M3U8(_decode(response.msg, body), base_uri=_parsed_url(url))
+        if self.cache:
+            etag = response.getheader('ETag')
+            last_modified = response.getheader('Last-Modified')
+            if etag or last_modified:
+                self._cached_playlists[uri] = CachedPlaylist(etag, last_modified, playlist)
+            else:
+                self._cached_playlists.pop(uri, None)
+        return playlist
+
+    def fetch(self, uri, timeout=None, headers=None):
+        '''
+        Returns the url `uri` redirected to and its content.
+        Raises HTTPError if the server answers with an error.
+        '''
+        url, response, body = self._fetch(uri, timeout, headers)
+        return url, _decode(response.msg, body)
+
+    def close(self):
+        with self._lock:
+            idle_connections, self._idle_connections = self._idle_connections, {}
+        for connections in idle_connections.values():
+            for connection in connections:
+                connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _fetch(self, uri, timeout, headers):
+        attempt = 0
+        while True:
+            try:
+                return self._fetch_once(uri, timeout, headers)
+            except Exception as error:
+                if self.retry is None or not self.retry.should_retry(error, attempt):
+                    raise
+                time.sleep(self.retry.delay(error, attempt))
+                attempt += 1
+
+    def _fetch_once(self, uri, timeout, headers):
+        if timeout is None:
+            timeout = self.timeout
+        request_headers = _with_accept_encoding(self.headers, headers)
+
+        url = uri
+        for _ in range(self.max_redirects + 1):
+            response, body = self._request(url, request_headers, timeout)
+            if response.status not in REDIRECT_STATUSES:
+                break
+            location = response.getheader('Location')
+            if location is None:
+                raise HTTPError(url, response.status, 'Redirect without Location',
+                                response.msg, None)
+            url = urljoin(url, location)
+        else:
+            raise HTTPError(url, response.status, 'Too many redirects', response.msg, None)
+
+        if response.status >= 400 or (response.status == 304 and
+                                      'If-None-Match' not in request_headers and
+                                      'If-Modified-Since' not in request_headers):
+            raise HTTPError(url, response.status, response.reason, response.msg, None)
+        return url, response, body
+
+    def _request(self, url, headers, timeout):
+        parsed_url = urlparse(url)
+        host = (parsed_url.scheme, parsed_url.netloc)
+        path = parsed_url.path or '/'
+        if parsed_url.query:
+            path += '?' + parsed_url.query
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(parsed_url.netloc)
+        while True:
+            connection = self._acquire(host)
+            reused = connection is not None
+            if not reused:
+                connection = _connect(host, timeout)
+            try:
+                if reused:
+                    _set_timeout(connection, timeout)
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                body = _read_body(response, response.getheader('Content-Encoding'))
+            except socket.timeout:
+                connection.close()
+                raise
+            except (HTTPException, socket.error):
+                connection.close()
+                # the server may have closed an idle connection, try
+                # again on a new one
+                if reused:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(host, connection)
+            return response, body
+
+    def _acquire(self, host):
+        with self._lock:
+            connections = self._idle_connections.get(host)
+            if connections:
+                return connections.pop()
+        return None
+
+    def _release(self, host, connection):
+        with self._lock:
+            self._idle_connections.setdefault(host, []).append(connection)
+
+
+def _retry_after(error):
+    headers = error.info() if isinstance(error, HTTPError) else None
+    value = headers.get('Retry-After') if headers is not None else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        # HTTP dates are not supported
+        return None
+
+
+def _connect(host, timeout):
+    scheme, netloc = host
+    connection_class = HTTPSConnection if scheme == 'https' else HTTPConnection
+    return connection_class(netloc, timeout=timeout)
+
+
+def _set_timeout(connection, timeout):
+    connection.timeout = timeout
+    if connection.sock is not None:
+        connection.sock.settimeout(timeout)
+
+
+def _with_accept_encoding(*headers):
+    '''
+    Merges `headers` dictionaries, advertising the content encodings
+    `_read_body` decompresses unless an Accept-Encoding header was given.
+    '''
+    merged = {}
+    for extra_headers in headers:
+        merged.update(extra_headers or {})
+    if not any(name.lower() == 'accept-encoding' for name in merged):
+        merged['Accept-Encoding'] = ACCEPT_ENCODING
+    return merged
+
+
+def _read_content(resource, message):
+    return _decode(message, _read_body(resource, message.get('Content-Encoding')))
+
+
+def _read_body(resource, content_encoding, chunk_size=CHUNK_SIZE):
+    '''
+    Reads the body of a response, decompressing it according to its
+    Content-Encoding as it is read.
+    '''
+    decompressor = _decompressor(content_encoding)
+    chunks = []
+    while True:
+        chunk = resource.read(chunk_size)
+        if not chunk:
+            break
+        chunks.append(decompressor.decompress(chunk))
+    chunks.append(decompressor.flush())
+    return b''.join(chunks)
+
+
+def _decompressor(content_encoding):
+    encoding = (content_encoding or '').strip().lower()
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        return _DeflateDecompressor()
+    if encoding == 'br' and brotli is not None:
+        return _BrotliDecompressor()
+    return _IdentityDecompressor()
+
+
+class _IdentityDecompressor(object):
+
+    def decompress(self, data):
+        return data
+
+    def flush(self):
+        return b''
+
+
+class _DeflateDecompressor(object):
+    '''
+    "deflate" should be a zlib stream, but some servers send raw deflate
+    data: the first chunk tells which one it is.
+    '''
+
+    def __init__(self):
+        self._decompressor = None
+
+    def decompress(self, data):
+        if self._decompressor is None:
+            self._decompressor = zlib.decompressobj()
+            try:
+                return self._decompressor.decompress(data)
+            except zlib.error:
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decompressor.decompress(data)
+
+    def flush(self):
+        if self._decompressor is None:
+            return b''
+        return self._decompressor.flush()
+
+
+class _BrotliDecompressor(object):
+
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data):
+        return self._decompressor.process(data)
+
+    def flush(self):
+        return b''
+
+
+def _parsed_url(url):
+    parsed_url = urlparse(url)
+    prefix = parsed_url.scheme + '://' + parsed_url.netloc
+    base_path = posixpath.normpath(parsed_url.path + '/..')
+    return urljoin(prefix, base_path)
+
+
+def _decode(message, body):
+    if PYTHON_MAJOR_VERSION < (3,):
+        return body.strip()
+    return body.decode(message.get_content_charset(failobj='utf-8'))
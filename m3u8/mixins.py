@@ -17,6 +17,8 @@ def _urijoin(base_uri, path):
 
 class BasePathMixin(object):
 
+    __slots__ = ()
+
     @property
     def absolute_uri(self):
         if self.uri is None:
@@ -41,6 +43,8 @@ class BasePathMixin(object):
 
 class GroupedBasePathMixin(object):
 
+    __slots__ = ()
+
     def _set_base_uri(self, new_base_uri):
         for item in self:
             item.base_uri = new_base_uri
@@ -3,13 +3,19 @@
 # Use of this source code is governed by a MIT License
 # license that can be found in the LICENSE file.
 
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import namedtuple
+import datetime
 import os
 import errno
 import math
 import re
+import weakref
 
-from m3u8.parser import parse, format_date_time
+import iso8601
+
+from m3u8.parser import parse, parse_tail, format_date_time, key_identity
 from m3u8.mixins import BasePathMixin, GroupedBasePathMixin
 
 
@@ -40,6 +46,28 @@ class M3U8(object):
       uri the playlist comes from. it is propagated to SegmentList and Key
       ex.: http://example.com/path/to
 
+     `lazy`
+      if True, `segments` is a `LazySegmentList` and `Segment` objects (and
+      `files`) are only created when accessed, or when `base_path` is set.
+      Useful when only the playlist attributes or a few segments are needed.
+
+     `columnar`
+      if True, `segments` is a `ColumnarSegmentList`, which stores the
+      segments attributes in arrays and creates `Segment` objects only
+      when accessed. Meant for playlists with tens of thousands of segments
+      kept in memory, like event archives. `lazy` is ignored.
+
+     `last_segments`
+      if given, only the last `last_segments` segments are parsed, see
+      `m3u8.parser.parse_tail`. `media_sequence` is still the one of the
+      whole playlist, and the kept segments have their keys and program
+      date times as if the whole playlist was parsed.
+
+     `drop_parsed_segments`
+      if True, the parsed segments are removed from `data` once `segments`
+      is built, instead of being kept there as well: playlists kept loaded
+      take about half the memory, but `data` has no 'segments' then.
+
     Attributes:
 
      `keys`
@@ -60,7 +88,7 @@ class M3U8(object):
        `keys` list will contain the key used for each set of segments.
 
      `segments`
-       a `SegmentList` object, represents the list of `Segment`s from this playlist
+       a `SegmentList` object, represents the list of `Segment`s from this playlist.
 
      `is_variant`
         Returns true if this M3U8 is a variant playlist, with links to
@@ -94,7 +122,8 @@ class M3U8(object):
         http://tools.ietf.org/html/draft-pantos-http-live-streaming-07#section-3.3.2
 
       `media_sequence`
-        Returns the EXT-X-MEDIA-SEQUENCE as an integer
+        Returns the EXT-X-MEDIA-SEQUENCE as an integer, the `media_sequence`
+        of `segments`: setting either one sets both
         http://tools.ietf.org/html/draft-pantos-http-live-streaming-07#section-3.3.3
 
       `program_date_time`
@@ -140,8 +169,14 @@ class M3U8(object):
     )
 
     def __init__(self, content=None, base_path=None, base_uri=None,
-                 strict=False):
-        if content is not None:
+                 strict=False, lazy=False, last_segments=None, columnar=False,
+                 drop_parsed_segments=False):
+        self.lazy = lazy
+        self.columnar = columnar
+        self.drop_parsed_segments = drop_parsed_segments
+        if content is not None and last_segments is not None:
+            self.data = parse_tail(content, last_segments, strict)
+        elif content is not None:
             self.data = parse(content, strict)
         else:
             self.data = {}
@@ -157,19 +192,28 @@ class M3U8(object):
     def _initialize_attributes(self):
         self.keys = [ Key(base_uri=self.base_uri, **params) if params else None
                       for params in self.data.get('keys', []) ]
-        self.segments = SegmentList([ Segment(base_uri=self.base_uri, keyobject=find_key(segment.get('key', {}), self.keys), **segment)
-                                      for segment in self.data.get('segments', []) ])
+        self._keys_by_identity = dict((key_identity(params), key) for params, key
+                                      in zip(self.data.get('keys', []), self.keys))
+        parsed_segments = self.data.get('segments', [])
+        if self.columnar:
+            self.segments = ColumnarSegmentList()
+            self.segments._extend_rows(parsed_segments, self.base_uri, self._keys_by_identity)
+            self._files = None
+        elif self.lazy:
+            self.segments = LazySegmentList(parsed_segments, self._create_segment)
+            self._files = None
+        else:
+            self.segments = SegmentList([ self._create_segment(segment)
+                                          for segment in parsed_segments ])
+            self._files = self._list_files()
+        if self.drop_parsed_segments and 'segments' in self.data:
+            # a copy, the dict given in `data` is left as it is
+            self.data = dict((name, value) for name, value in self.data.items()
+                             if name != 'segments')
         #self.keys = get_uniques([ segment.key for segment in self.segments ])
         for attr, param in self.simple_attributes:
             setattr(self, attr, self.data.get(param))
 
-        self.files = []
-        for key in self.keys:
-            # Avoid None key, it could be the first one, don't repeat them
-            if key and key.uri not in self.files:
-                self.files.append(key.uri)
-        self.files.extend(self.segments.uri)
-
         self.media = MediaList([ Media(base_uri=self.base_uri, **media)
                                  for media in self.data.get('media', []) ])
 
@@ -183,9 +227,35 @@ class M3U8(object):
                                          iframe_stream_info=ifr_pl['iframe_stream_info'])
                                         )
 
+    def _create_segment(self, segment):
+        return Segment(base_uri=self.base_uri,
+                       keyobject=find_key_by_identity(segment.get('key'), self._keys_by_identity),
+                       **segment)
+
+    def _list_files(self):
+        files = []
+        key_uris = set()
+        for key in self.keys:
+            # Avoid None key, it could be the first one, don't repeat them
+            if key and key.uri not in key_uris:
+                key_uris.add(key.uri)
+                files.append(key.uri)
+        files.extend(self.segments.uri)
+        return files
+
     def __unicode__(self):
         return self.dumps()
 
+    @property
+    def files(self):
+        if self._files is None:
+            self._files = self._list_files()
+        return self._files
+
+    @files.setter
+    def files(self, files):
+        self._files = files
+
     @property
     def base_uri(self):
         return self._base_uri
@@ -200,6 +270,14 @@ class M3U8(object):
             if key:
                 key.base_uri = new_base_uri
 
+    @property
+    def media_sequence(self):
+        return self.segments.media_sequence
+
+    @media_sequence.setter
+    def media_sequence(self, media_sequence):
+        self.segments.media_sequence = media_sequence
+
     @property
     def base_path(self):
         return self._base_path
@@ -212,6 +290,9 @@ class M3U8(object):
     def _update_base_path(self):
         if self._base_path is None:
             return
+        if self._files is None:
+            # as in the eager mode, `files` are the uris before base_path
+            self._files = self._list_files()
         for key in self.keys:
             if key:
                 key.base_path = self._base_path
@@ -351,11 +432,19 @@ class Segment(BasePathMixin):
 
     `key`
       Key used to encrypt the segment (EXT-X-KEY)
+
+    `media_sequence`
+      media sequence number of the segment, set by the `SegmentList` it
+      is added to
     '''
 
+    __slots__ = ('uri', 'duration', 'title', 'base_uri', 'byterange',
+                 'program_date_time', 'discontinuity', 'cue_out', 'scte35',
+                 'scte35_duration', 'key', 'media_sequence')
+
     def __init__(self, uri, base_uri, program_date_time=None, duration=None,
                  title=None, byterange=None, cue_out=False, discontinuity=False, key=None,
-                 scte35=None, scte35_duration=None, keyobject=None):
+                 scte35=None, scte35_duration=None, keyobject=None, media_sequence=None):
         self.uri = uri
         self.duration = duration
         self.title = title
@@ -368,6 +457,7 @@ class Segment(BasePathMixin):
         self.scte35_duration = scte35_duration
         self.key = keyobject
         # Key(base_uri=base_uri, **key) if key else None
+        self.media_sequence = media_sequence
 
     def dumps(self, last_segment):
         output = []
@@ -405,6 +495,40 @@ class Segment(BasePathMixin):
 
 
 class SegmentList(list, GroupedBasePathMixin):
+    '''
+    The segments of a playlist.
+
+    `media_sequence` is the media sequence number of the first segment (0
+    if None), the EXT-X-MEDIA-SEQUENCE of the playlist, and the segments
+    are numbered in order from it, in their `media_sequence` attributes.
+    Numbers stay the same as the list changes, as in a live playlist:
+    removing the first segments moves `media_sequence` on, and a segment
+    inserted before the first one takes the previous number (unless it
+    would be negative). Other insertions and removals renumber the
+    segments after them. A list created from the segments of another one
+    keeps their numbers. `by_sequence` and `sequence_range` find segments
+    by number in O(1).
+
+    `segment_at`, `segment_at_datetime` and `range` find segments by time
+    in O(log n) with an index of the start offset and program date time of
+    every segment. The index is built on the first lookup and dropped when
+    segments are added, removed or replaced. Segments do not know the
+    lists they are in, so after changing the duration or program date time
+    of a segment in place `invalidate_time_index` has to be called.
+    '''
+
+    _time_index = None
+    _media_sequence = None
+
+    def __init__(self, segments=()):
+        super(SegmentList, self).__init__(segments)
+        self._number_from_first()
+        self._renumber(0)
+
+    def __setstate__(self, state):
+        # pickle adds the segments before restoring `media_sequence`
+        self.__dict__.update(state)
+        self._renumber(0)
 
     def __str__(self):
         output = []
@@ -418,9 +542,1086 @@ class SegmentList(list, GroupedBasePathMixin):
     def uri(self):
         return [seg.uri for seg in self]
 
+    @property
+    def total_duration(self):
+        return sum(seg.duration for seg in self)
+
     def by_key(self, key):
         return [ segment for segment in self if segment.key == key ]
 
+    @property
+    def media_sequence(self):
+        return self._media_sequence
+
+    @media_sequence.setter
+    def media_sequence(self, media_sequence):
+        self._media_sequence = media_sequence
+        self._renumber(0)
+
+    def by_sequence(self, media_sequence):
+        '''
+        Returns the segment numbered `media_sequence`, or None if it is not
+        in the list.
+        '''
+        index = media_sequence - (self._media_sequence or 0)
+        return self[index] if 0 <= index < len(self) else None
+
+    def sequence_range(self, start, stop=None):
+        '''
+        Returns a `SegmentList` of the segments numbered from `start` up to,
+        but not including, `stop` (to the end if None). They keep their
+        numbers.
+        '''
+        first = self._media_sequence or 0
+        stop = len(self) if stop is None else min(len(self), stop - first)
+        return SegmentList(self[index] for index in range(max(0, start - first), stop))
+
+    def media_sequence_of(self, segment):
+        '''
+        Returns the media sequence number of `segment` in this list, its
+        `media_sequence` attribute unless the segment was numbered by
+        another list since.
+        Raises ValueError if it is not in the list.
+        '''
+        number = segment.media_sequence
+        if number is not None and self.by_sequence(number) is segment:
+            return number
+        return (self._media_sequence or 0) + self.index(segment)
+
+    def append(self, segment):
+        super(SegmentList, self).append(segment)
+        if len(self) == 1:
+            self._number_from_first()
+        self._changed(len(self) - 1)
+
+    def extend(self, segments):
+        start = len(self)
+        super(SegmentList, self).extend(segments)
+        if start == 0:
+            self._number_from_first()
+        self._changed(start)
+
+    def insert(self, index, segment):
+        length = len(self)
+        position = max(0, index + length) if index < 0 else min(index, length)
+        super(SegmentList, self).insert(index, segment)
+        if position == 0 and length and self._media_sequence:
+            # before the first segment, the other ones keep their numbers
+            self._media_sequence -= 1
+            self._changed(0, 1)
+        else:
+            self._changed(position)
+
+    def remove(self, segment):
+        del self[self.index(segment)]
+
+    def pop(self, index=-1):
+        segment = self[index]
+        del self[index]
+        return segment
+
+    def clear(self):
+        del self[:]
+
+    def sort(self, *args, **kwargs):
+        super(SegmentList, self).sort(*args, **kwargs)
+        self._changed(0)
+
+    def reverse(self):
+        super(SegmentList, self).reverse()
+        self._changed(0)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start = index.indices(len(self))[0]
+        else:
+            start = index + len(self) if index < 0 else index
+        super(SegmentList, self).__setitem__(index, value)
+        self._changed(start)
+
+    def __delitem__(self, index):
+        length = len(self)
+        if isinstance(index, slice):
+            removed = sorted(range(*index.indices(length)))
+        else:
+            removed = [index + length if index < 0 else index]
+        super(SegmentList, self).__delitem__(index)
+        self._removed(removed)
+
+    # python 2 calls these for slices without step
+    def __setslice__(self, start, stop, segments):
+        self.__setitem__(slice(start, stop), segments)
+
+    def __delslice__(self, start, stop):
+        self.__delitem__(slice(start, stop))
+
+    def __iadd__(self, segments):
+        self.extend(segments)
+        return self
+
+    def __imul__(self, times):
+        super(SegmentList, self).__imul__(times)
+        self._changed(0)
+        return self
+
+    def _number_from_first(self):
+        # a list without number created from, or first filled with, the
+        # segments of another list keeps their numbers
+        if self._media_sequence is None and len(self):
+            first = list.__getitem__(self, 0)
+            if isinstance(first, Segment) and first.media_sequence is not None:
+                self._media_sequence = first.media_sequence
+
+    def _changed(self, start, stop=None):
+        self._time_index = None
+        self._renumber(start, stop)
+
+    def _removed(self, indexes):
+        # removing the first segments moves the media sequence on
+        prefix = 0
+        while prefix < len(indexes) and indexes[prefix] == prefix:
+            prefix += 1
+        if prefix:
+            self._media_sequence = (self._media_sequence or 0) + prefix
+        self._changed(indexes[prefix] - prefix if prefix < len(indexes) else len(self))
+
+    def _renumber(self, start, stop=None):
+        first = self._media_sequence or 0
+        for index in range(start, len(self) if stop is None else stop):
+            segment = list.__getitem__(self, index)
+            # parsed dicts of a LazySegmentList are numbered when created
+            if isinstance(segment, Segment) and segment.media_sequence != first + index:
+                segment.media_sequence = first + index
+
+    def segment_at(self, offset):
+        '''
+        Returns the segment playing `offset` seconds after the start of the
+        first one, or None if the segments end before.
+        '''
+        index = self._index_at(offset)
+        return None if index is None else self[index]
+
+    def segment_at_datetime(self, date_time):
+        '''
+        Returns the segment whose program date time span includes
+        `date_time` (UTC if naive), or None if there is none.
+        '''
+        time_index = self._get_time_index()
+        timestamp = _timestamp(date_time)
+        position = bisect_right(time_index.timestamps, timestamp) - 1
+        if position < 0:
+            return None
+        index = time_index.timestamp_indexes[position]
+        end = time_index.timestamps[position] + \
+            time_index.starts[index + 1] - time_index.starts[index]
+        return self[index] if timestamp < end else None
+
+    def range(self, start, end):
+        '''
+        Returns the slice of segments playing between `start` and `end`
+        seconds after the start of the first one.
+        '''
+        starts = self._get_time_index().starts
+        first = max(0, bisect_right(starts, start) - 1)
+        last = min(len(starts) - 1, bisect_left(starts, end))
+        return self[first:max(first, last)]
+
+    def invalidate_time_index(self):
+        '''
+        Drops the time index, to be rebuilt on the next lookup.
+        '''
+        self._time_index = None
+
+    def _index_at(self, offset):
+        starts = self._get_time_index().starts
+        if not 0 <= offset < starts[-1]:
+            return None
+        return bisect_right(starts, offset) - 1
+
+    def _get_time_index(self):
+        if self._time_index is None:
+            self._time_index = _TimeIndex(self._durations(), self._timestamps())
+        return self._time_index
+
+    def _durations(self):
+        return (segment.duration for segment in self)
+
+    def _timestamps(self):
+        return (_timestamp(segment.program_date_time) for segment in self)
+
+    def to_arrays(self, media_sequence=None):
+        '''
+        Returns the segments as a dictionary of columns, for analytics that
+        would otherwise loop over the segments:
+
+          - `duration` and `program_date_time` (as seconds since the epoch)
+            in `array('d')`s, NaN standing for None
+          - `discontinuity` and `cue_out` in `array('b')`s
+          - `media_sequence` in an `array('l')`, counting from
+            `media_sequence` (the one of the list if None)
+          - `uri` and `title` lists
+        '''
+        columns = _empty_columns()
+        for segment in self:
+            columns['uri'].append(segment.uri)
+            columns['title'].append(segment.title)
+            columns['duration'].append(_NAN if segment.duration is None else segment.duration)
+            columns['program_date_time'].append(_timestamp(segment.program_date_time))
+            columns['discontinuity'].append(bool(segment.discontinuity))
+            columns['cue_out'].append(bool(segment.cue_out))
+        if media_sequence is None:
+            media_sequence = self.media_sequence or 0
+        columns['media_sequence'].extend(range(media_sequence,
+                                               media_sequence + len(columns['uri'])))
+        return columns
+
+    def to_numpy(self, media_sequence=None):
+        '''
+        Same as `to_arrays`, with NumPy arrays: `program_date_time` is a
+        `datetime64[us]` array in UTC, NaT standing for None, the flags
+        are booleans and `uri` and `title` object arrays.
+        Raises ImportError if NumPy is not installed.
+        '''
+        import numpy
+
+        columns = self.to_arrays(media_sequence)
+        timestamps = numpy.frombuffer(columns['program_date_time'], dtype=numpy.float64)
+        missing = numpy.isnan(timestamps)
+        program_date_time = numpy.where(missing, 0, numpy.round(timestamps * 1e6)) \
+            .astype(numpy.int64).astype('datetime64[us]')
+        program_date_time[missing] = numpy.datetime64('NaT', 'us')
+        return {
+            'uri': numpy.array(columns['uri'], dtype=object),
+            'title': numpy.array(columns['title'], dtype=object),
+            'duration': numpy.frombuffer(columns['duration'], dtype=numpy.float64),
+            'program_date_time': program_date_time,
+            'discontinuity': numpy.frombuffer(columns['discontinuity'], dtype=numpy.int8).astype(bool),
+            'cue_out': numpy.frombuffer(columns['cue_out'], dtype=numpy.int8).astype(bool),
+            'media_sequence': numpy.array(columns['media_sequence'], dtype=numpy.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, columns, base_uri=None):
+        '''
+        Creates a list of segments from a dictionary of columns like the
+        ones returned by `to_arrays` or `to_numpy`. Only `uri` is required,
+        program date times are created in UTC and the first `media_sequence`
+        is the one of the list.
+        Raises ValueError if the columns have different lengths.
+        '''
+        uris = _column_values(columns, 'uri')
+        rows = zip(uris,
+                   _column_values(columns, 'title', len(uris)),
+                   _column_values(columns, 'duration', len(uris)),
+                   _column_values(columns, 'program_date_time', len(uris)),
+                   _column_values(columns, 'discontinuity', len(uris), False),
+                   _column_values(columns, 'cue_out', len(uris), False))
+        segments = cls()
+        for uri, title, duration, program_date_time, discontinuity, cue_out in rows:
+            segments.append(Segment(uri, base_uri,
+                                    program_date_time=_date_time(program_date_time),
+                                    duration=None if duration != duration else duration,
+                                    title=title, discontinuity=bool(discontinuity),
+                                    cue_out=bool(cue_out)))
+        media_sequences = _column_values(columns, 'media_sequence', len(uris))
+        if media_sequences and media_sequences[0] is not None:
+            segments.media_sequence = int(media_sequences[0])
+        return segments
+
+
+class _TimeIndex(object):
+    '''
+    Time index of a `SegmentList`: `starts` holds the offset where every
+    segment starts, plus where the last one ends, and `timestamps` the
+    program date times (as seconds since the epoch) of the segments that
+    have one, sorted, with their indexes in `timestamp_indexes`.
+    '''
+
+    def __init__(self, durations, timestamps):
+        self.starts = array('d', [0])
+        total = 0
+        for duration in durations:
+            if duration is not None and duration == duration:
+                total += duration
+            self.starts.append(total)
+        dated = sorted((timestamp, index) for index, timestamp in enumerate(timestamps)
+                       if timestamp == timestamp)
+        self.timestamps = array('d', [timestamp for timestamp, _ in dated])
+        self.timestamp_indexes = array('l', [index for _, index in dated])
+
+
+def _empty_columns():
+    return {'uri': [], 'title': [], 'duration': array('d'), 'program_date_time': array('d'),
+            'discontinuity': array('b'), 'cue_out': array('b'), 'media_sequence': array('l')}
+
+
+def _column_values(columns, name, length=None, default=None):
+    values = columns.get(name)
+    if values is None:
+        if length is None:
+            raise KeyError(name)
+        return [default] * length
+    # NumPy arrays and array.array turn their items into python objects
+    values = values.tolist() if hasattr(values, 'tolist') else list(values)
+    if length is not None and len(values) != length:
+        raise ValueError('The %s column has %d values instead of %d'
+                         % (name, len(values), length))
+    return values
+
+
+def _timestamp(date_time):
+    if date_time is None:
+        return _NAN
+    if date_time.tzinfo is None:
+        date_time = date_time.replace(tzinfo=iso8601.UTC)
+    delta = date_time - _EPOCH_UTC
+    return delta.days * 86400 + delta.seconds + delta.microseconds / 1e6
+
+
+def _date_time(value):
+    if value is None or isinstance(value, datetime.datetime):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=iso8601.UTC)
+        return value
+    if value != value:
+        return None
+    return _EPOCH_UTC + datetime.timedelta(seconds=value)
+
+
+class LazySegmentList(SegmentList):
+    '''
+    A `SegmentList` built from the segment dictionaries returned by the
+    parser, which are turned into `Segment` objects by `factory` only when
+    they are indexed or iterated.
+    '''
+
+    def __init__(self, segments=(), factory=None):
+        super(LazySegmentList, self).__init__(segments)
+        self._factory = factory
+
+    def _materialize(self, index):
+        segment = list.__getitem__(self, index)
+        if isinstance(segment, dict):
+            segment = self._factory(segment)
+            if index < 0:
+                index += len(self)
+            segment.media_sequence = (self._media_sequence or 0) + index
+            list.__setitem__(self, index, segment)
+        return segment
+
+    def _materialize_all(self):
+        for index in range(len(self)):
+            self._materialize(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # the segments are shared, so they keep their numbers in this list
+            start, stop, step = index.indices(len(self))
+            segments = SegmentList()
+            segments._media_sequence = (self._media_sequence or 0) + start
+            list.extend(segments, [self._materialize(i) for i in range(start, stop, step)])
+            return segments
+        return self._materialize(index)
+
+    # python 2 calls this for slices without step
+    def __getslice__(self, start, stop):
+        return self.__getitem__(slice(start, stop))
+
+    def __iter__(self):
+        index = 0
+        while index < len(self):
+            yield self._materialize(index)
+            index += 1
+
+    def __reversed__(self):
+        for index in range(len(self) - 1, -1, -1):
+            yield self._materialize(index)
+
+    def pop(self, index=-1):
+        segment = self._materialize(index)
+        super(LazySegmentList, self).pop(index)
+        return segment
+
+    def _durations(self):
+        return (item.get('duration') if isinstance(item, dict) else item.duration
+                for item in list.__iter__(self))
+
+    def _timestamps(self):
+        return (_timestamp(item.get('program_date_time') if isinstance(item, dict)
+                           else item.program_date_time)
+                for item in list.__iter__(self))
+
+
+def _materializing(name):
+    method = getattr(SegmentList, name)
+
+    def wrapper(self, *args, **kwargs):
+        self._materialize_all()
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = name
+    return wrapper
+
+# `index`, `remove`, `count` and `in` are left alone: segments have no
+# custom equality, so a `Segment` can only match an already created one.
+for _name in ('__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__',
+              '__repr__', '__add__', '__mul__', '__rmul__', 'copy', 'sort'):
+    if hasattr(list, _name):
+        setattr(LazySegmentList, _name, _materializing(_name))
+del _name
+
+
+class ColumnarSegmentList(SegmentList):
+    '''
+    A `SegmentList` storing its segments as columns instead of `Segment`
+    objects, for playlists with tens of thousands of segments:
+
+      - durations and program date times (as microseconds) in `array('d')`
+        columns, with NaN standing for None
+      - `discontinuity` and `cue_out` in `array('b')` columns
+      - keys, base uris and the time zones of the program date times as
+        runs of equal values
+      - uris, titles, byteranges and SCTE35 attributes as indexes into a
+        table of strings, where all but uris are interned
+
+    Indexing or iterating creates `Segment` views of the rows, reading and
+    writing the columns; a view removed from the list keeps its values.
+    Segments added to the list are copied into the columns, so they match
+    (e.g. in `remove` or `index`) the rows with the same attribute values.
+    `uri`, `total_duration`, `to_arrays` and slicing work on the columns
+    without creating views, and `by_key` creates only the views it returns.
+    '''
+
+    def __init__(self, segments=()):
+        list.__init__(self)
+        self._table = _ValueTable()
+        self._columns = dict((name, array('i')) for name in _TABLE_ATTRIBUTES)
+        self._columns['duration'] = array('d')
+        self._columns['program_date_time'] = array('d')
+        for name in _FLAG_ATTRIBUTES:
+            self._columns[name] = array('b')
+        self._runs = dict((name, _RunLengthColumn()) for name in _RUN_ATTRIBUTES)
+        self._rows = weakref.WeakValueDictionary()
+        self.extend(segments)
+
+    def __len__(self):
+        return len(self._columns['duration'])
+
+    def __iter__(self):
+        index = 0
+        while index < len(self):
+            yield self._row(index)
+            index += 1
+
+    def __reversed__(self):
+        for index in range(len(self) - 1, -1, -1):
+            yield self._row(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self._slice(start, max(start, stop))
+            return ColumnarSegmentList(self._row(i) for i in range(start, stop, step))
+        return self._row(self._position(index))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            segments = list(value)
+            if step == 1:
+                # replacing segments does not move the media sequence on
+                media_sequence = self._media_sequence
+                del self[start:max(start, stop)]
+                for offset, segment in enumerate(segments):
+                    self.insert(start + offset, segment)
+                self._media_sequence = media_sequence
+                return
+            indexes = range(start, stop, step)
+            if len(segments) != len(indexes):
+                raise ValueError('attempt to assign sequence of size %d to extended '
+                                 'slice of size %d' % (len(segments), len(indexes)))
+            for i, segment in zip(indexes, segments):
+                self[i] = segment
+            return
+        self._time_index = None
+        index = self._position(index)
+        values = _segment_values(value)
+        self._detach(index)
+        for name, value in zip(_SEGMENT_ATTRIBUTES, values):
+            self._set(index, name, value)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            # in order, so the first rows move the media sequence on
+            for removed, i in enumerate(sorted(range(*index.indices(len(self))))):
+                self._delete(i - removed)
+        else:
+            self._delete(self._position(index))
+
+    # python 2 calls these for slices without step, the ones of list
+    # would work on the empty list storage
+    def __getslice__(self, start, stop):
+        return self.__getitem__(slice(start, stop))
+
+    def __setslice__(self, start, stop, segments):
+        self.__setitem__(slice(start, stop), segments)
+
+    def __delslice__(self, start, stop):
+        self.__delitem__(slice(start, stop))
+
+    def __contains__(self, segment):
+        return self._find(segment, 0, len(self)) is not None
+
+    def __eq__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __add__(self, other):
+        result = self.copy()
+        result.extend(other)
+        return result
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, times):
+        self[:] = list(self) * times
+        return self
+
+    def __reduce__(self):
+        return (ColumnarSegmentList, (list(self),), {'_media_sequence': self._media_sequence})
+
+    @property
+    def uri(self):
+        table = self._table
+        return [table[i] for i in self._columns['uri']]
+
+    @property
+    def total_duration(self):
+        return sum(self._columns['duration'])
+
+    def by_key(self, key):
+        segments = []
+        for start, stop, value in self._runs['key'].runs():
+            if value == key:
+                segments.extend(self._row(i) for i in range(start, stop))
+        return segments
+
+    def to_arrays(self, media_sequence=None):
+        columns = _empty_columns()
+        table = self._table
+        columns['uri'] = [table[i] for i in self._columns['uri']]
+        columns['title'] = [table[i] for i in self._columns['title']]
+        columns['duration'] = self._columns['duration'][:]
+        columns['program_date_time'].extend(self._timestamps())
+        for name in _FLAG_ATTRIBUTES:
+            columns[name] = self._columns[name][:]
+        if media_sequence is None:
+            media_sequence = self.media_sequence or 0
+        columns['media_sequence'].extend(range(media_sequence, media_sequence + len(self)))
+        return columns
+
+    def _number_from_first(self):
+        # done by _append_row
+        pass
+
+    def _renumber(self, start, stop=None):
+        # rows are numbered by their position
+        pass
+
+    def _durations(self):
+        return self._columns['duration']
+
+    def _timestamps(self):
+        microseconds = self._columns['program_date_time']
+        for start, stop, tzinfo in self._runs['tzinfo'].runs():
+            offset = tzinfo.utcoffset(None) if tzinfo is not None else datetime.timedelta(0)
+            if offset is None:
+                # the offset changes with the date
+                for index in range(start, stop):
+                    yield _timestamp(self._get(index, 'program_date_time'))
+                continue
+            offset = offset.days * 86400 + offset.seconds + offset.microseconds / 1e6
+            for value in microseconds[start:stop]:
+                yield value / 1e6 - offset
+
+    def _set_base_uri(self, new_base_uri):
+        self._runs['base_uri'].fill(new_base_uri)
+
+    base_uri = property(None, _set_base_uri)
+
+    def append(self, segment):
+        self._append_row(*_segment_arguments(segment))
+
+    def extend(self, segments):
+        for segment in list(segments):
+            self.append(segment)
+
+    def insert(self, index, segment):
+        self._time_index = None
+        length = len(self)
+        if index < 0:
+            index = max(0, index + length)
+        if index >= length:
+            self.append(segment)
+            return
+        values = _segment_values(segment)
+        for column in self._columns.values():
+            column.insert(index, 0)
+        for run in self._runs.values():
+            run.insert(index, None)
+        self._shift_rows(index, 1)
+        if index == 0 and self._media_sequence:
+            # before the first row, the other ones keep their numbers
+            self._media_sequence -= 1
+        for name, value in zip(_SEGMENT_ATTRIBUTES, values):
+            self._set(index, name, value)
+
+    def remove(self, segment):
+        index = self._find(segment, 0, len(self))
+        if index is None:
+            raise ValueError('segment not in list')
+        self._delete(index)
+
+    def pop(self, index=-1):
+        if not len(self):
+            raise IndexError('pop from empty list')
+        index = self._position(index)
+        segment = self._row(index)
+        self._delete(index)
+        return segment
+
+    def index(self, segment, start=0, stop=None):
+        start, stop, _ = slice(start, stop).indices(len(self))
+        index = self._find(segment, start, stop)
+        if index is None:
+            raise ValueError('segment not in list')
+        return index
+
+    def count(self, segment):
+        if isinstance(segment, _SegmentRow) and segment._segments is self:
+            return 1
+        return sum(1 for index in range(len(self)) if self._matches(index, segment))
+
+    def clear(self):
+        del self[:]
+
+    def copy(self):
+        return self[:]
+
+    def reverse(self):
+        self[:] = list(reversed(list(self)))
+
+    def sort(self, key=None, reverse=False):
+        self[:] = sorted(list(self), key=key, reverse=reverse)
+
+    def _position(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('list index out of range')
+        return index
+
+    def _row(self, index):
+        row = self._rows.get(index)
+        if row is None:
+            row = _SegmentRow.__new__(_SegmentRow)
+            row._segments = self
+            row._index = index
+            self._rows[index] = row
+        return row
+
+    def _get(self, index, name):
+        if name in self._runs:
+            return self._runs[name][index]
+        value = self._columns[name][index]
+        if name in _FLAG_ATTRIBUTES:
+            return bool(value)
+        if name in _TABLE_ATTRIBUTES:
+            return self._table[value]
+        if value != value:
+            return None
+        if name == 'duration':
+            return value
+        return _EPOCH.replace(tzinfo=self._runs['tzinfo'][index]) + \
+            datetime.timedelta(microseconds=value)
+
+    def _set(self, index, name, value):
+        # like segments of the other lists, rows changed in place do not
+        # drop the time index
+        if name in self._runs:
+            self._runs[name][index] = value
+        elif name in _FLAG_ATTRIBUTES:
+            self._columns[name][index] = bool(value)
+        elif name == 'uri':
+            self._columns[name][index] = self._table.add(value)
+        elif name in _TABLE_ATTRIBUTES:
+            self._columns[name][index] = self._table.intern(value)
+        elif name == 'duration':
+            self._columns[name][index] = _NAN if value is None else value
+        else:
+            microseconds, tzinfo = _microseconds(value)
+            self._columns[name][index] = microseconds
+            self._runs['tzinfo'][index] = tzinfo
+
+    def _append_row(self, uri, base_uri, program_date_time=None, duration=None,
+                    title=None, byterange=None, cue_out=False, discontinuity=False,
+                    key=None, scte35=None, scte35_duration=None, keyobject=None,
+                    media_sequence=None):
+        # same arguments as Segment, so parsed segments can be added
+        # without creating Segment objects
+        self._time_index = None
+        if self._media_sequence is None and not len(self):
+            # the segments of another list keep their numbers
+            self._media_sequence = media_sequence
+        columns = self._columns
+        intern = self._table.intern
+        columns['uri'].append(self._table.add(uri))
+        columns['title'].append(intern(title))
+        columns['byterange'].append(intern(byterange))
+        columns['scte35'].append(intern(scte35))
+        columns['scte35_duration'].append(intern(scte35_duration))
+        microseconds, tzinfo = _microseconds(program_date_time)
+        columns['program_date_time'].append(microseconds)
+        self._runs['tzinfo'].append(tzinfo)
+        self._runs['key'].append(keyobject)
+        self._runs['base_uri'].append(base_uri)
+        columns['discontinuity'].append(bool(discontinuity))
+        columns['cue_out'].append(bool(cue_out))
+        # the length is the one of the durations column, it goes last
+        columns['duration'].append(_NAN if duration is None else duration)
+
+    def _extend_rows(self, segments, base_uri, keys_by_identity):
+        # parsed segments, added a column at a time: several times faster
+        # than an _append_row call for each of them
+        self._time_index = None
+        columns = self._columns
+        table = self._table
+        columns['uri'].extend(table.add_all([segment['uri'] for segment in segments]))
+        for name in _TABLE_ATTRIBUTES[1:]:
+            columns[name].fromlist(table.intern_all([segment.get(name) for segment in segments]))
+        date_times = [_microseconds(segment.get('program_date_time')) for segment in segments]
+        columns['program_date_time'].fromlist([microseconds for microseconds, _ in date_times])
+        self._runs['tzinfo'].extend([tzinfo for _, tzinfo in date_times])
+        self._runs['base_uri'].extend([base_uri] * len(segments))
+        keys = []
+        keydata = key = None
+        for segment in segments:
+            # consecutive segments share the dict of their key
+            if segment.get('key') is not keydata:
+                keydata = segment.get('key')
+                key = find_key_by_identity(keydata, keys_by_identity)
+            keys.append(key)
+        self._runs['key'].extend(keys)
+        for name in _FLAG_ATTRIBUTES:
+            columns[name].fromlist([bool(segment.get(name)) for segment in segments])
+        # the length is the one of the durations column, it goes last
+        columns['duration'].fromlist([_NAN if segment.get('duration') is None
+                                      else segment['duration'] for segment in segments])
+
+    def _delete(self, index):
+        self._time_index = None
+        self._detach(index)
+        if index == 0:
+            self._media_sequence = (self._media_sequence or 0) + 1
+        for run in self._runs.values():
+            run.delete(index)
+        for column in self._columns.values():
+            del column[index]
+        self._shift_rows(index + 1, -1)
+
+    def _detach(self, index):
+        row = self._rows.pop(index, None)
+        if row is not None:
+            values = [self._get(index, name) for name in _SEGMENT_ATTRIBUTES]
+            media_sequence = row.media_sequence
+            row._segments = None
+            for name, value in zip(_SEGMENT_ATTRIBUTES, values):
+                setattr(row, name, value)
+            row.media_sequence = media_sequence
+
+    def _shift_rows(self, start, offset):
+        moved = [(index, row) for index, row in list(self._rows.items()) if index >= start]
+        for index, row in moved:
+            del self._rows[index]
+        for index, row in moved:
+            row._index = index + offset
+            self._rows[index + offset] = row
+
+    def _slice(self, start, stop):
+        segments = ColumnarSegmentList()
+        segments._media_sequence = (self._media_sequence or 0) + start
+        segments._table = self._table
+        for name, column in self._columns.items():
+            segments._columns[name] = column[start:stop]
+        for name, run in self._runs.items():
+            segments._runs[name] = run.slice(start, stop)
+        return segments
+
+    def _find(self, segment, start, stop):
+        if isinstance(segment, _SegmentRow) and segment._segments is self:
+            return segment._index if start <= segment._index < stop else None
+        for index in range(start, stop):
+            if self._matches(index, segment):
+                return index
+        return None
+
+    def _matches(self, index, segment):
+        if not isinstance(segment, Segment):
+            return False
+        return all(self._get(index, name) == getattr(segment, name)
+                   for name in _SEGMENT_ATTRIBUTES)
+
+
+def _columnar(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        return method(list(self), *args, **kwargs)
+    wrapper.__name__ = name
+    return wrapper
+
+for _name in ('__lt__', '__le__', '__gt__', '__ge__', '__mul__', '__rmul__'):
+    setattr(ColumnarSegmentList, _name, _columnar(_name))
+del _name
+
+# media sequence numbers come from the position of the rows
+_SEGMENT_ATTRIBUTES = tuple(name for name in Segment.__slots__ if name != 'media_sequence')
+_TABLE_ATTRIBUTES = ('uri', 'title', 'byterange', 'scte35', 'scte35_duration')
+_FLAG_ATTRIBUTES = ('discontinuity', 'cue_out')
+_RUN_ATTRIBUTES = ('key', 'base_uri', 'tzinfo')
+
+_NAN = float('nan')
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=iso8601.UTC)
+
+
+def _segment_values(segment):
+    return [getattr(segment, name) for name in _SEGMENT_ATTRIBUTES]
+
+
+def _segment_arguments(segment):
+    # positional arguments of Segment to create a copy of `segment`
+    return (segment.uri, segment.base_uri, segment.program_date_time,
+            segment.duration, segment.title, segment.byterange, segment.cue_out,
+            segment.discontinuity, None, segment.scte35, segment.scte35_duration,
+            segment.key, segment.media_sequence)
+
+
+def _microseconds(date_time):
+    if date_time is None:
+        return _NAN, None
+    delta = date_time.replace(tzinfo=None) - _EPOCH
+    return float((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds), \
+        date_time.tzinfo
+
+
+class _SegmentRow(Segment):
+    '''
+    A `Segment` whose attributes are stored in a row of a
+    `ColumnarSegmentList`, or in its own slots once removed from it.
+    '''
+
+    __slots__ = ('_segments', '_index', '__weakref__')
+
+    def __reduce__(self):
+        # pickled and copied as a plain Segment
+        return (Segment, _segment_arguments(self))
+
+
+def _row_attribute(name):
+    slot = getattr(Segment, name)
+
+    def getter(self):
+        if self._segments is None:
+            return slot.__get__(self, Segment)
+        return self._segments._get(self._index, name)
+
+    def setter(self, value):
+        if self._segments is None:
+            slot.__set__(self, value)
+        else:
+            self._segments._set(self._index, name, value)
+    return property(getter, setter)
+
+for _name in _SEGMENT_ATTRIBUTES:
+    setattr(_SegmentRow, _name, _row_attribute(_name))
+del _name
+
+
+def _row_media_sequence(self):
+    if self._segments is None:
+        return Segment.media_sequence.__get__(self, Segment)
+    return (self._segments._media_sequence or 0) + self._index
+
+
+def _set_row_media_sequence(self, media_sequence):
+    if self._segments is not None:
+        raise AttributeError('The media sequence numbers of the segments of a '
+                             'ColumnarSegmentList are their positions')
+    Segment.media_sequence.__set__(self, media_sequence)
+
+_SegmentRow.media_sequence = property(_row_media_sequence, _set_row_media_sequence)
+
+
+class _ValueTable(object):
+    '''
+    Append only table of the values of the string columns of a
+    `ColumnarSegmentList`, index 0 is None.
+
+    Values are interned, except uris: they are hardly ever repeated and
+    indexing them would take more memory than the uris themselves.
+    '''
+
+    def __init__(self):
+        self._values = [None]
+        self._indexes = {None: 0}
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def add(self, value):
+        if value is None:
+            return 0
+        self._values.append(value)
+        return len(self._values) - 1
+
+    def add_all(self, values):
+        # same as `add` for each value, but Nones are stored too
+        start = len(self._values)
+        self._values.extend(values)
+        return range(start, len(self._values))
+
+    def intern(self, value):
+        try:
+            return self._indexes[value]
+        except KeyError:
+            index = self._indexes[value] = len(self._values)
+        except TypeError:
+            # unhashable values are stored as they are
+            index = len(self._values)
+        self._values.append(value)
+        return index
+
+    def intern_all(self, values):
+        indexes, intern = self._indexes, self.intern
+        try:
+            return [indexes[value] if value in indexes else intern(value) for value in values]
+        except TypeError:
+            return [intern(value) for value in values]
+
+
+class _RunLengthColumn(object):
+    '''
+    A column of a `ColumnarSegmentList` stored as runs of the same value:
+    `starts` holds the row where each run starts and `values` its value.
+    Values are compared by identity.
+    '''
+
+    def __init__(self, starts=None, values=None, length=0):
+        self.starts = starts if starts is not None else array('l')
+        self.values = values if values is not None else []
+        self.length = length
+
+    def __getitem__(self, index):
+        return self.values[bisect_right(self.starts, index) - 1]
+
+    def __setitem__(self, index, value):
+        run = self._split(index)
+        if index + 1 < self.length:
+            self._split(index + 1)
+        self.values[run] = value
+        self._merge(run)
+
+    def runs(self):
+        starts, values = self.starts, self.values
+        for run, start in enumerate(starts):
+            stop = starts[run + 1] if run + 1 < len(starts) else self.length
+            yield start, stop, values[run]
+
+    def append(self, value):
+        if not self.values or self.values[-1] is not value:
+            self.starts.append(self.length)
+            self.values.append(value)
+        self.length += 1
+
+    def extend(self, values):
+        starts, runs = self.starts, self.values
+        for index, value in enumerate(values, self.length):
+            if not runs or runs[-1] is not value:
+                starts.append(index)
+                runs.append(value)
+        self.length += len(values)
+
+    def insert(self, index, value):
+        if index >= self.length:
+            self.append(value)
+            return
+        # the run holding `index` grows by one row, which is then set
+        starts = self.starts
+        for run in range(bisect_right(starts, index), len(starts)):
+            starts[run] += 1
+        self.length += 1
+        self[index] = value
+
+    def delete(self, index):
+        starts, values = self.starts, self.values
+        run = bisect_right(starts, index) - 1
+        stop = starts[run + 1] if run + 1 < len(starts) else self.length
+        if stop - starts[run] == 1:
+            del starts[run]
+            del values[run]
+        else:
+            run += 1
+        for next_run in range(run, len(starts)):
+            starts[next_run] -= 1
+        self.length -= 1
+        if 0 < run < len(starts) and values[run - 1] is values[run]:
+            del starts[run]
+            del values[run]
+
+    def fill(self, value):
+        self.starts = array('l', [0] if self.length else [])
+        self.values = [value] if self.length else []
+
+    def slice(self, start, stop):
+        if start >= stop:
+            return _RunLengthColumn()
+        first = bisect_right(self.starts, start) - 1
+        last = bisect_right(self.starts, stop - 1)
+        starts = array('l', [0])
+        starts.extend(run_start - start for run_start in self.starts[first + 1:last])
+        return _RunLengthColumn(starts, self.values[first:last], stop - start)
+
+    def _split(self, index):
+        # makes a run start at `index` and returns it
+        starts = self.starts
+        run = bisect_right(starts, index) - 1
+        if starts[run] != index:
+            run += 1
+            starts.insert(run, index)
+            self.values.insert(run, self.values[run - 1])
+        return run
+
+    def _merge(self, run):
+        starts, values = self.starts, self.values
+        if run + 1 < len(starts) and values[run + 1] is values[run]:
+            del starts[run + 1]
+            del values[run + 1]
+        if run > 0 and values[run - 1] is values[run]:
+            del starts[run]
+            del values[run]
+
 
 class Key(BasePathMixin):
     '''
@@ -440,6 +1641,8 @@ class Key(BasePathMixin):
 
     '''
 
+    __slots__ = ('method', 'uri', 'iv', 'keyformat', 'keyformatversions', 'base_uri')
+
     def __init__(self, method, base_uri, uri=None, iv=None, keyformat=None, keyformatversions=None):
         self.method = method
         self.uri = uri
@@ -476,6 +1679,14 @@ class Key(BasePathMixin):
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        """
+        Returns a hash of the attributes identifying the key, matching
+        `m3u8.parser.key_identity` for the parsed key.
+        """
+        return hash((self.method, self.uri, self.iv, self.keyformat,
+                     self.keyformatversions))
+
 
 class Playlist(BasePathMixin):
     '''
@@ -490,12 +1701,17 @@ class Playlist(BasePathMixin):
 
     `media` is a list of related Media entries.
 
+    `media_playlist` is the M3U8 object `uri` points to, set by `m3u8.resolve`.
+
     More info: http://tools.ietf.org/html/draft-pantos-http-live-streaming-07#section-3.3.10
     '''
 
+    __slots__ = ('uri', 'base_uri', 'media_playlist', 'stream_info', 'media')
+
     def __init__(self, uri, stream_info, media, base_uri):
         self.uri = uri
         self.base_uri = base_uri
+        self.media_playlist = None
 
         resolution = stream_info.get('resolution')
         if resolution != None:
@@ -559,12 +1775,17 @@ class IFramePlaylist(BasePathMixin):
      `program_id`, `bandwidth`, `codecs` and `resolution` which
      is a tuple (w, h) of integers
 
+    `media_playlist` is the M3U8 object `uri` points to, set by `m3u8.resolve`.
+
     More info: http://tools.ietf.org/html/draft-pantos-http-live-streaming-07#section-3.3.13
     '''
 
+    __slots__ = ('uri', 'base_uri', 'media_playlist', 'iframe_stream_info')
+
     def __init__(self, base_uri, uri, iframe_stream_info):
         self.uri = uri
         self.base_uri = base_uri
+        self.media_playlist = None
 
         resolution = iframe_stream_info.get('resolution')
         if resolution is not None:
@@ -629,6 +1850,9 @@ class Media(BasePathMixin):
 
     `base_uri`
       uri the media comes from in URI hierarchy. ex.: http://example.com/path/to
+
+    `media_playlist`
+      the M3U8 object `uri` points to, set by `m3u8.resolve`
     '''
 
     TYPE_AUDIO = 'AUDIO'
@@ -640,6 +1864,10 @@ class Media(BasePathMixin):
     INSTREAM_ID_PATTERN = re.compile('^(CC[1-4]|'
                                      'SERVICE([1-9]|[1-5]\d|6[0-3]))$')
 
+    __slots__ = ('base_uri', 'uri', '_type', '_group_id', 'language', '_name',
+                 '_default', '_autoselect', '_forced', 'assoc_language',
+                 '_instream_id', 'characteristics', 'extras', 'media_playlist')
+
     def __init__(self, uri=None, type=None, group_id=None, language=None,
                  name=None, default=None, autoselect=None, forced=None,
                  characteristics=None, assoc_language=None,
@@ -657,6 +1885,7 @@ class Media(BasePathMixin):
         self.instream_id = instream_id
         self.characteristics = characteristics
         self.extras = extras
+        self.media_playlist = None
 
     def __eq__(self, other):
         """
@@ -851,6 +2080,19 @@ def find_key(keydata, keylist):
     raise KeyError("No key found for key data")
 
 
+def find_key_by_identity(keydata, keys_by_identity):
+    '''
+    Same as `find_key`, but resolves the key in O(1) from a dict of `Key`
+    objects indexed by `m3u8.parser.key_identity`.
+    '''
+    if not keydata:
+        return None
+    try:
+        return keys_by_identity[key_identity(keydata)]
+    except KeyError:
+        raise KeyError("No key found for key data")
+
+
 def denormalize_attribute(attribute):
     return attribute.replace('_', '-').upper()
 
@@ -5,7 +5,9 @@
 
 import iso8601
 import datetime
+import io
 import itertools
+import mmap
 import re
 from m3u8 import protocol
 
@@ -15,9 +17,51 @@ http://stackoverflow.com/questions/2785755/how-to-split-but-ignore-separators-in
 '''
 ATTRIBUTELISTPATTERN = re.compile(r'''((?:[^,"']|"[^"]*"|'[^']*')+)''')
 
+# Single pass version of the pattern above, matching NAME=VALUE pairs
+ATTRIBUTEPATTERN = re.compile(r'''([^,="']*)=((?:[^,"']+|"[^"]*"|'[^']*')*)''')
+
+# EXT-X-KEY attributes that tell two keys apart, see key_identity()
+KEY_IDENTITY_ATTRIBUTES = ('method', 'uri', 'iv', 'keyformat', 'keyformatversions')
+
+
+# The fixed format live packagers use for EXT-X-PROGRAM-DATE-TIME,
+# ex.: 2014-08-13T13:36:33.000+00:00, see cast_date_time()
+DATE_TIME_PATTERN = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:\d{2})$')
+
+# tzinfo objects built by iso8601, by time zone designator
+_TIMEZONES = {}
+
+# datetime.timedelta objects by segment duration, see _duration_to_timedelta()
+_TIMEDELTAS = {}
+
 
 def cast_date_time(value):
-    return iso8601.parse_date(value)
+    '''
+    Parses an ISO 8601 date time, as `iso8601.parse_date` would.
+
+    Values in the fixed format used by live playlists are decoded directly,
+    reusing the time zone iso8601 built the first time it was seen; anything
+    else goes through `iso8601.parse_date`.
+    '''
+    match = DATE_TIME_PATTERN.match(value)
+    if match is None:
+        return iso8601.parse_date(value)
+    year, month, day, hour, minute, second, fraction, timezone = match.groups()
+    tzinfo = _TIMEZONES.get(timezone)
+    if tzinfo is None:
+        date_time = iso8601.parse_date(value)
+        if len(_TIMEZONES) < 64:
+            _TIMEZONES[timezone] = date_time.tzinfo
+        return date_time
+    # iso8601 truncates the fraction to microseconds
+    microsecond = int(fraction[:6].ljust(6, '0')) if fraction else 0
+    try:
+        return datetime.datetime(int(year), int(month), int(day), int(hour),
+                                 int(minute), int(second), microsecond, tzinfo)
+    except ValueError:
+        # let iso8601 report invalid dates
+        return iso8601.parse_date(value)
 
 
 def format_date_time(value):
@@ -37,8 +81,218 @@ class ParseError(Exception):
 def parse(content, strict=False):
     '''
     Given a M3U8 playlist content returns a dictionary with all data found
+
+    `content` can also be an UTF-8 encoded bytes-like object (bytes,
+    bytearray, memoryview or mmap), which is decoded one line at a time.
     '''
-    data = {
+    data = _new_data()
+    state = _new_state()
+    if isinstance(content, _BUFFER_TYPES):
+        lines = buffer_to_lines(content)
+    else:
+        lines = string_to_lines(content)
+    _parse_lines(lines, data, state, strict)
+    return data
+
+
+def _parse_lines(lines, data, state, strict, lineno=0):
+    for line in lines:
+        lineno += 1
+        line = line.strip()
+        _parse_line(line, data, state, lineno, strict)
+        # Some tags (e.g. Elemental's EXT-X-CUE-OUT) carry data on the line
+        # before them, so keep it around instead of re-splitting the content.
+        state['previous_line'] = line
+    return lineno
+
+
+def parse_tail(content, last_segments, strict=False):
+    '''
+    Same as ``parse()``, but only the last `last_segments` segments are
+    decoded. They are found scanning backwards from the end of the content,
+    the skipped segments are only accounted for in `media_sequence`, and the
+    key, program date time and SCTE-35 state they leave behind is rebuilt
+    from the closest tags preceding the kept segments.
+    '''
+    if isinstance(content, _BUFFER_TYPES):
+        content = _as_bytes(content).decode('utf-8')
+    if last_segments < 1:
+        raise ValueError('last_segments must be a positive number')
+    content = content.strip().replace('\r\n', '\n')
+
+    first_extinf = len(content)
+    for _ in range(last_segments):
+        first_extinf = content.rfind(protocol.extinf, 0, first_extinf)
+        if first_extinf == -1:
+            return parse(content, strict)
+    cut = _segment_start(content, first_extinf)
+    # the header tags can't be told apart from the first segment tags,
+    # so the header goes up to the first EXTINF
+    head_end = content.rfind('\n', 0, content.find(protocol.extinf)) + 1
+    if cut <= head_end:
+        return parse(content, strict)
+
+    data = _new_data()
+    state = _new_state()
+    _parse_lines(string_to_lines(content[:head_end]), data, state, strict)
+
+    # forget what the header left for the first segment, the state at the
+    # cut is rebuilt below
+    state = _new_state()
+    del data['keys'][:]
+    del data['segments'][:]
+    _restore_state_at(content, cut, first_extinf, data, state)
+
+    _parse_lines(content[cut:].split('\n'), data, state, strict,
+                 lineno=content.count('\n', 0, cut))
+
+    if data['media_sequence'] is not None:
+        data['media_sequence'] += content.count(protocol.extinf, head_end, cut)
+    position = _find_tag(content, protocol.ext_x_program_date_time, 0, len(content))
+    if position != -1:
+        data['program_date_time'] = cast_date_time(_value_at(content, position))
+    return data
+
+
+def _segment_start(content, position):
+    '''
+    Returns where the segment whose EXTINF is at `position` starts, that is,
+    right after the previous URI line, so its tags (key, discontinuity...)
+    are kept with it.
+    '''
+    position = content.rfind('\n', 0, position) + 1
+    while position > 0:
+        line_start = content.rfind('\n', 0, position - 1) + 1
+        line = content[line_start:position].strip()
+        if line and not line.startswith('#'):
+            break
+        position = line_start
+    return position
+
+
+def _restore_state_at(content, cut, first_extinf, data, state):
+    # tags between the cut and the first kept EXTINF are parsed again, so
+    # the key is looked up before the EXTINF and added to the keys list
+    position = _rfind_tag(content, protocol.ext_x_key, 0, first_extinf)
+    if position != -1:
+        state['current_key'] = _parse_key(_line_at(content, position))
+        _add_key(state['current_key'], data, state)
+
+    position = _rfind_tag(content, protocol.ext_x_program_date_time, 0, cut)
+    if position != -1:
+        program_date_time = cast_date_time(_value_at(content, position))
+        for duration in EXTINF_DURATION_PATTERN.findall(content, position, cut):
+            program_date_time += _duration_to_timedelta(float(duration))
+        state['current_program_date_time'] = program_date_time
+
+    end = cut
+    while True:
+        # matches both EXT-X-CUE-OUT and EXT-X-CUE-OUT-CONT
+        position = _rfind_tag(content, protocol.ext_x_cue_out_start, 0, end)
+        if position == -1:
+            break
+        line = _line_at(content, position)
+        if line.startswith(protocol.ext_x_cue_out + ':'):
+            _parse_cueout(line, state)
+        else:
+            _parse_cueout_start(line, state, _line_at(content, content.rfind('\n', 0, position - 1) + 1))
+        if 'current_cue_out_scte35' in state:
+            break
+        end = position
+
+
+def _find_tag(content, tag, start, end):
+    position = content.find(tag, start, end)
+    while position != -1 and _is_segment_uri(content, position):
+        position = content.find(tag, position + 1, end)
+    return position
+
+
+def _rfind_tag(content, tag, start, end):
+    position = content.rfind(tag, start, end)
+    while position != -1 and _is_segment_uri(content, position):
+        position = content.rfind(tag, start, position)
+    return position
+
+
+def _is_segment_uri(content, position):
+    '''
+    Lines right after EXTINF/BYTERANGE are taken as the segment URI by the
+    parser, whatever they contain.
+    '''
+    line_start = content.rfind('\n', 0, position) + 1
+    if line_start == 0:
+        return False
+    previous_line = _line_at(content, content.rfind('\n', 0, line_start - 1) + 1)
+    return previous_line.startswith((protocol.extinf, protocol.ext_x_byterange))
+
+
+def _line_at(content, position):
+    end = content.find('\n', position)
+    return content[position:end if end != -1 else len(content)].strip()
+
+
+def _value_at(content, position):
+    return _line_at(content, position).split(':', 1)[1]
+
+
+# (event name, data key) pairs yielded by iterparse, in emission order
+_ITERPARSE_EVENTS = (
+    ('key', 'keys'),
+    ('segment', 'segments'),
+    ('media', 'media'),
+    ('variant', 'playlists'),
+    ('iframe_variant', 'iframe_playlists'),
+)
+
+
+def iterparse(source, strict=False):
+    '''
+    Incrementally parses a M3U8 playlist, yielding ``(event, value)`` tuples
+    as soon as each item is complete, without accumulating them.
+
+    `source` can be the content as string, a file object (text or binary)
+    or any iterable of lines or chunks (str or bytes, UTF-8 encoded).
+
+    Events and values are the same dictionaries found in ``parse()``:
+
+      ('key', key)                    every EXT-X-KEY tag, once for each
+                                      distinct key as in ``parse()['keys']``
+      ('segment', segment)            every media segment
+      ('media', media)                every EXT-X-MEDIA tag
+      ('variant', playlist)           every EXT-X-STREAM-INF playlist
+      ('iframe_variant', playlist)    every EXT-X-I-FRAME-STREAM-INF tag
+      ('playlist', attributes)        last event, with playlist level data
+                                      (target duration, media sequence, ...)
+    '''
+    data = _new_data()
+    state = _new_state()
+
+    lineno = 0
+    for line in iter_lines(source):
+        line = line.strip()
+        if not lineno and not line:
+            # leading blank lines are not counted, as in string_to_lines
+            continue
+        lineno += 1
+        _parse_line(line, data, state, lineno, strict)
+        state['previous_line'] = line
+
+        for event, data_key in _ITERPARSE_EVENTS:
+            items = data[data_key]
+            if items:
+                for item in items:
+                    # None only flags unencrypted segments in parse()
+                    if item is not None:
+                        yield event, item
+                del items[:]
+
+    yield 'playlist', dict((name, value) for name, value in data.items()
+                           if not isinstance(value, list))
+
+
+def _new_data():
+    return {
         'media_sequence': 0,
         'is_variant': False,
         'is_endlist': False,
@@ -52,141 +306,224 @@ def parse(content, strict=False):
         'keys': [],
     }
 
-    state = {
+
+def _new_state():
+    return {
         'expect_segment': False,
         'expect_playlist': False,
         'current_key': None,
+        'key_identities': set(),
+        'previous_line': '',
     }
 
-    lineno = 0
-    for line in string_to_lines(content):
-        lineno += 1
-        line = line.strip()
 
-        if line.startswith(protocol.ext_x_byterange):
-            _parse_byterange(line, state)
-            state['expect_segment'] = True
+# Playlist level tags read by parse_header(), anchored at line starts
+HEADER_PATTERNS = dict(
+    (tag, re.compile(r'^[ \t]*%s:[ \t]*([^\r\n]*)' % re.escape(tag), re.MULTILINE))
+    for tag in (protocol.ext_x_targetduration, protocol.ext_x_media_sequence,
+                protocol.ext_x_playlist_type)
+)
+EXTINF_DURATION_PATTERN = re.compile(r'^[ \t]*%s:[ \t]*([^,\r\n]*)' % protocol.extinf,
+                                     re.MULTILINE)
+
+
+def parse_header(content):
+    '''
+    Given a M3U8 playlist content returns a dictionary with only the
+    playlist level data, using the same keys as ``parse()``:
+
+      `targetduration`, `media_sequence`, `playlist_type`, `is_endlist`,
+      `is_variant`, plus `segment_count` and `total_duration`
+
+    Segments, keys and attribute lists are not parsed, so it is much cheaper
+    than ``parse()`` when only checking if a playlist is stale.
+    '''
+    data = {
+        'media_sequence': 0,
+        'is_variant': protocol.ext_x_stream_inf in content,
+        'is_endlist': protocol.ext_x_endlist in content,
+        'playlist_type': None,
+    }
+
+    match = HEADER_PATTERNS[protocol.ext_x_targetduration].search(content)
+    if match:
+        data['targetduration'] = float(match.group(1))
+    match = HEADER_PATTERNS[protocol.ext_x_media_sequence].search(content)
+    if match:
+        data['media_sequence'] = int(match.group(1))
+    match = HEADER_PATTERNS[protocol.ext_x_playlist_type].search(content)
+    if match:
+        data['playlist_type'] = normalize_attribute(match.group(1))
+    if data['is_variant']:
+        data['media_sequence'] = None
+
+    durations = [float(duration) for duration in EXTINF_DURATION_PATTERN.findall(content)]
+    data['segment_count'] = len(durations)
+    data['total_duration'] = sum(durations)
+    return data
 
-        elif line.startswith(protocol.extinf):
-            _parse_extinf(line, data, state, lineno, strict)
-            state['expect_segment'] = True
 
-        elif state['expect_segment']:
+def _parse_line(line, data, state, lineno, strict):
+    '''
+    Dispatches a single stripped line to its tag handler.
+
+    URI lines take a fast path: they never have a handler, so they only
+    need to be matched against the segment/playlist expectations.
+    '''
+    if not line.startswith('#'):
+        if state['expect_segment']:
             _parse_ts_chunk(line, data, state)
             state['expect_segment'] = False
-
         elif state['expect_playlist']:
             _parse_variant_playlist(line, data, state)
             state['expect_playlist'] = False
+        elif line and strict:
+            raise ParseError(lineno, line)
+        return
+
+    tag = line.split(':', 1)[0]
+    if tag in _SEGMENT_TAGS:
+        _TAG_HANDLERS[tag](line, data, state, lineno, strict)
+    elif state['expect_segment']:
+        _parse_ts_chunk(line, data, state)
+        state['expect_segment'] = False
+    elif state['expect_playlist']:
+        _parse_variant_playlist(line, data, state)
+        state['expect_playlist'] = False
+    else:
+        handler = _TAG_HANDLERS.get(tag)
+        if handler is not None:
+            handler(line, data, state, lineno, strict)
 
-        elif line.startswith(protocol.ext_x_targetduration):
-            _parse_simple_parameter(line, data, float)
 
-        elif line.startswith(protocol.ext_x_media_sequence):
-            _parse_simple_parameter(line, data, int)
+def _handle_byterange(line, data, state, lineno, strict):
+    _parse_byterange(line, state)
+    state['expect_segment'] = True
 
-        elif line.startswith(protocol.ext_x_program_date_time):
-            _, program_date_time = _parse_simple_parameter_raw_value(line, cast_date_time)
-            if not data.get('program_date_time'):
-                data['program_date_time'] = program_date_time
-            state['current_program_date_time'] = program_date_time
 
-        elif line.startswith(protocol.ext_x_discontinuity):
-            state['discontinuity'] = True
+def _handle_extinf(line, data, state, lineno, strict):
+    _parse_extinf(line, data, state, lineno, strict)
+    state['expect_segment'] = True
 
-        elif line.startswith(protocol.ext_x_cue_out):
-            _parse_cueout(line, state)
-            state['cue_out'] = True
-            state['cue_start'] = True
 
-        elif line.startswith(protocol.ext_x_cue_out_start):
-            _parse_cueout_start(line, state, string_to_lines(content)[lineno - 2])
-            state['cue_out'] = True
-            state['cue_start'] = True
+def _handle_targetduration(line, data, state, lineno, strict):
+    _parse_simple_parameter(line, data, float)
 
-        elif line.startswith(protocol.ext_x_cue_span):
-            state['cue_out'] = True
-            state['cue_start'] = True
 
-        elif line.startswith(protocol.ext_x_version):
-            _parse_simple_parameter(line, data)
+def _handle_media_sequence(line, data, state, lineno, strict):
+    _parse_simple_parameter(line, data, int)
 
-        elif line.startswith(protocol.ext_x_allow_cache):
-            _parse_simple_parameter(line, data)
 
-        elif line.startswith(protocol.ext_x_key):
-            key = _parse_key(line)
-            state['current_key'] = key
-            if key not in data['keys']:
-                data['keys'].append(key)
+def _handle_simple_parameter(line, data, state, lineno, strict):
+    _parse_simple_parameter(line, data)
 
-        elif line.startswith(protocol.extinf):
-            _parse_extinf(line, data, state, lineno, strict)
-            state['expect_segment'] = True
 
-        elif line.startswith(protocol.ext_x_stream_inf):
-            state['expect_playlist'] = True
-            _parse_stream_inf(line, data, state)
+def _handle_program_date_time(line, data, state, lineno, strict):
+    program_date_time = cast_date_time(line[len(protocol.ext_x_program_date_time) + 1:])
+    if not data.get('program_date_time'):
+        data['program_date_time'] = program_date_time
+    state['current_program_date_time'] = program_date_time
 
-        elif line.startswith(protocol.ext_x_i_frame_stream_inf):
-            _parse_i_frame_stream_inf(line, data)
 
-        elif line.startswith(protocol.ext_x_media):
-            _parse_media(line, data, state)
+def _handle_discontinuity(line, data, state, lineno, strict):
+    state['discontinuity'] = True
 
-        elif line.startswith(protocol.ext_x_playlist_type):
-            _parse_simple_parameter(line, data)
 
-        elif line.startswith(protocol.ext_i_frames_only):
-            data['is_i_frames_only'] = True
+def _handle_cue_out(line, data, state, lineno, strict):
+    _parse_cueout(line, state)
+    state['cue_out'] = True
+    state['cue_start'] = True
 
-        elif line.startswith(protocol.ext_is_independent_segments):
-            data['is_independent_segments'] = True
 
-        elif line.startswith(protocol.ext_x_endlist):
-            data['is_endlist'] = True
+def _handle_cue_out_start(line, data, state, lineno, strict):
+    _parse_cueout_start(line, state, state['previous_line'])
+    state['cue_out'] = True
+    state['cue_start'] = True
 
-        elif line.startswith('#'):
-            # comment
-            pass
 
-        elif line.strip() == '':
-            # blank lines are legal
-            pass
+def _handle_cue_span(line, data, state, lineno, strict):
+    state['cue_out'] = True
+    state['cue_start'] = True
 
-        elif state['expect_segment']:
-            _parse_ts_chunk(line, data, state)
-            state['expect_segment'] = False
 
-        elif state['expect_playlist']:
-            _parse_variant_playlist(line, data, state)
-            state['expect_playlist'] = False
+def _handle_key(line, data, state, lineno, strict):
+    key = _parse_key(line)
+    state['current_key'] = key
+    _add_key(key, data, state)
 
-        elif strict:
-            raise ParseError(lineno, line)
 
-    return data
+def _handle_stream_inf(line, data, state, lineno, strict):
+    state['expect_playlist'] = True
+    _parse_stream_inf(line, data, state)
+
+
+def _handle_i_frame_stream_inf(line, data, state, lineno, strict):
+    _parse_i_frame_stream_inf(line, data)
+
+
+def _handle_media(line, data, state, lineno, strict):
+    _parse_media(line, data, state)
+
+
+def _handle_i_frames_only(line, data, state, lineno, strict):
+    data['is_i_frames_only'] = True
+
+
+def _handle_independent_segments(line, data, state, lineno, strict):
+    data['is_independent_segments'] = True
+
+
+def _handle_endlist(line, data, state, lineno, strict):
+    data['is_endlist'] = True
+
+
+# Tags are looked up by their exact name (everything before the first ':'),
+# so a line costs a single dict lookup instead of a chain of prefix checks.
+_TAG_HANDLERS = {
+    protocol.ext_x_byterange: _handle_byterange,
+    protocol.extinf: _handle_extinf,
+    protocol.ext_x_targetduration: _handle_targetduration,
+    protocol.ext_x_media_sequence: _handle_media_sequence,
+    protocol.ext_x_program_date_time: _handle_program_date_time,
+    protocol.ext_x_discontinuity: _handle_discontinuity,
+    protocol.ext_x_cue_out: _handle_cue_out,
+    protocol.ext_x_cue_out_start: _handle_cue_out_start,
+    protocol.ext_x_cue_span: _handle_cue_span,
+    protocol.ext_x_version: _handle_simple_parameter,
+    protocol.ext_x_allow_cache: _handle_simple_parameter,
+    protocol.ext_x_key: _handle_key,
+    protocol.ext_x_stream_inf: _handle_stream_inf,
+    protocol.ext_x_i_frame_stream_inf: _handle_i_frame_stream_inf,
+    protocol.ext_x_media: _handle_media,
+    protocol.ext_x_playlist_type: _handle_simple_parameter,
+    protocol.ext_i_frames_only: _handle_i_frames_only,
+    protocol.ext_is_independent_segments: _handle_independent_segments,
+    protocol.ext_x_endlist: _handle_endlist,
+}
+
+# Tags that belong to the segment being built, so they are handled even
+# while the parser is waiting for that segment's URI.
+_SEGMENT_TAGS = frozenset([protocol.ext_x_byterange, protocol.extinf])
+
+
+def _add_key(key, data, state):
+    identity = key_identity(key)
+    if identity not in state['key_identities']:
+        state['key_identities'].add(identity)
+        data['keys'].append(key)
 
 
 def _parse_key(line):
-    params = ATTRIBUTELISTPATTERN.split(line.replace(protocol.ext_x_key + ':', ''))[1::2]
     key = {}
-    for param in params:
-        name, value = param.split('=', 1)
-        key[normalize_attribute(name)] = remove_quotes(value)
+    for name, value in ATTRIBUTEPATTERN.findall(line, len(protocol.ext_x_key) + 1):
+        key[_normalized_attribute_name(name)] = remove_quotes(value)
     return key
 
 
 def _parse_extinf(line, data, state, lineno, strict):
-    chunks = line.replace(protocol.extinf + ':', '').split(',')
-    if len(chunks) == 2:
-        duration, title = chunks
-    elif len(chunks) == 1:
-        if strict:
-            raise ParseError(lineno, line)
-        else:
-            duration = chunks[0]
-            title = ''
+    duration, comma, title = line[len(protocol.extinf) + 1:].partition(',')
+    if not comma and strict:
+        raise ParseError(lineno, line)
     if 'segment' not in state:
         state['segment'] = {}
     state['segment']['duration'] = float(duration)
@@ -197,7 +534,7 @@ def _parse_ts_chunk(line, data, state):
     segment = state.pop('segment')
     if state.get('current_program_date_time'):
         segment['program_date_time'] = state['current_program_date_time']
-        state['current_program_date_time'] += datetime.timedelta(seconds=segment['duration'])
+        state['current_program_date_time'] += _duration_to_timedelta(segment['duration'])
     segment['uri'] = line
     segment['cue_out'] = state.pop('cue_out', False)
     if state.get('current_cue_out_scte35'):
@@ -208,18 +545,25 @@ def _parse_ts_chunk(line, data, state):
         segment['key'] = state['current_key']
     else:
         # For unencrypted segments, the initial key would be None
-        if None not in data['keys']:
-            data['keys'].append(None)
+        _add_key(None, data, state)
     data['segments'].append(segment)
 
 
-def _parse_attribute_list(prefix, line, atribute_parser):
-    params = ATTRIBUTELISTPATTERN.split(line.replace(prefix + ':', ''))[1::2]
+def _duration_to_timedelta(duration):
+    # segment durations repeat a lot, and building a timedelta is expensive
+    try:
+        return _TIMEDELTAS[duration]
+    except KeyError:
+        delta = datetime.timedelta(seconds=duration)
+        if len(_TIMEDELTAS) < 1024:
+            _TIMEDELTAS[duration] = delta
+        return delta
 
+
+def _parse_attribute_list(prefix, line, atribute_parser):
     attributes = {}
-    for param in params:
-        name, value = param.split('=', 1)
-        name = normalize_attribute(name)
+    for name, value in ATTRIBUTEPATTERN.findall(line, len(prefix) + 1):
+        name = _normalized_attribute_name(name)
 
         if name in atribute_parser:
             value = atribute_parser[name](value)
@@ -228,21 +572,32 @@ def _parse_attribute_list(prefix, line, atribute_parser):
 
     return attributes
 
+
+# normalize_attribute() results, by attribute name as found in the playlist
+_NORMALIZED_ATTRIBUTE_NAMES = {}
+
+
+def _normalized_attribute_name(name):
+    try:
+        return _NORMALIZED_ATTRIBUTE_NAMES[name]
+    except KeyError:
+        normalized = normalize_attribute(name)
+        # only well known names are expected, don't let junk grow the table
+        if len(_NORMALIZED_ATTRIBUTE_NAMES) < 1024:
+            _NORMALIZED_ATTRIBUTE_NAMES[name] = normalized
+        return normalized
+
+
 def _parse_stream_inf(line, data, state):
     data['is_variant'] = True
     data['media_sequence'] = None
-    atribute_parser = remove_quotes_parser('codecs', 'audio', 'video', 'subtitles')
-    atribute_parser["program_id"] = int
-    atribute_parser["bandwidth"] = lambda x: int(float(x))
-    atribute_parser["average_bandwidth"] = int
-    state['stream_info'] = _parse_attribute_list(protocol.ext_x_stream_inf, line, atribute_parser)
+    state['stream_info'] = _parse_attribute_list(protocol.ext_x_stream_inf, line,
+                                                 STREAM_INF_ATTRIBUTE_PARSER)
 
 
 def _parse_i_frame_stream_inf(line, data):
-    atribute_parser = remove_quotes_parser('codecs', 'uri')
-    atribute_parser["program_id"] = int
-    atribute_parser["bandwidth"] = int
-    iframe_stream_info = _parse_attribute_list(protocol.ext_x_i_frame_stream_inf, line, atribute_parser)
+    iframe_stream_info = _parse_attribute_list(protocol.ext_x_i_frame_stream_inf, line,
+                                               I_FRAME_STREAM_INF_ATTRIBUTE_PARSER)
     iframe_playlist = {'uri': iframe_stream_info.pop('uri'),
                        'iframe_stream_info': iframe_stream_info}
 
@@ -250,8 +605,7 @@ def _parse_i_frame_stream_inf(line, data):
 
 
 def _parse_media(line, data, state):
-    quoted = remove_quotes_parser('uri', 'group_id', 'language', 'name', 'characteristics')
-    media = _parse_attribute_list(protocol.ext_x_media, line, quoted)
+    media = _parse_attribute_list(protocol.ext_x_media, line, MEDIA_ATTRIBUTE_PARSER)
     data['media'].append(media)
 
 
@@ -315,10 +669,98 @@ def _parse_cueout_start(line, state, prevline):
         state['current_cue_out_scte35'] = _cueout_state[0]
         state['current_cue_out_duration'] = _cueout_state[1]
     
+# contents decoded by parse() and parse_tail(); python 2 `str` is bytes too
+_BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+def _as_bytes(buffer):
+    # memoryviews have no find()/rfind() and do not decode
+    if isinstance(buffer, memoryview):
+        return buffer.tobytes()
+    return buffer[:]
+
+
 def string_to_lines(string):
     return string.strip().replace('\r\n', '\n').split('\n')
 
 
+def buffer_to_lines(buffer, chunk_size=64 * 1024):
+    '''
+    Yields the lines of an UTF-8 encoded bytes-like `buffer`, like
+    `string_to_lines` would for its decoded content, without decoding
+    or copying the whole buffer at once. As in files opened in text mode,
+    lines end with \\n, \\r\\n or \\r.
+    '''
+    if isinstance(buffer, memoryview):
+        buffer = _as_bytes(buffer)
+    start, end = 0, len(buffer)
+    while start < end and buffer[start:start + 1].isspace():
+        start += 1
+    while end > start and buffer[end - 1:end].isspace():
+        end -= 1
+
+    while start < end:
+        # chunks end on line boundaries, so that neither \\r\\n nor
+        # multibyte characters are split
+        stop = start + chunk_size
+        if stop < end:
+            newline = buffer.rfind(b'\n', start, stop)
+            if newline == -1:
+                newline = buffer.find(b'\n', stop, end)
+            stop = end if newline == -1 else newline + 1
+        else:
+            stop = end
+        chunk = buffer[start:stop].decode('utf-8').replace('\r\n', '\n')
+        start = stop
+        if '\r' in chunk:
+            chunk = chunk.replace('\r', '\n')
+        lines = chunk.split('\n')
+        if chunk.endswith('\n'):
+            lines.pop()
+        for line in lines:
+            yield line
+
+
+def iter_lines(source, chunk_size=64 * 1024):
+    '''
+    Yields the lines from `source`, without line terminators.
+
+    `source` can be a string, a file object or an iterable of str/bytes
+    chunks, which do not need to be aligned to line boundaries. Bytes are
+    decoded as UTF-8 one line at a time.
+    '''
+    # bytes first: on python 2 they are also `str`
+    if isinstance(source, bytes):
+        chunks = io.BytesIO(source)
+    elif isinstance(source, _text_type):
+        chunks = [source]
+    elif hasattr(source, 'read'):
+        chunks = iter(lambda: source.read(chunk_size), source.read(0))
+    else:
+        chunks = source
+
+    pending = None
+    for chunk in chunks:
+        if pending:
+            chunk = pending + chunk
+        lines = chunk.split(b'\n' if isinstance(chunk, bytes) else '\n')
+        # the last piece may continue in the next chunk
+        pending = lines.pop()
+        for line in lines:
+            yield _decode_line(line)
+    if pending:
+        yield _decode_line(pending)
+
+
+_text_type = type(u'')
+
+
+def _decode_line(line):
+    if isinstance(line, bytes):
+        return line.decode('utf-8')
+    return line
+
+
 def remove_quotes_parser(*attrs):
     return dict(zip(attrs, itertools.repeat(remove_quotes)))
 
@@ -339,6 +781,29 @@ def remove_quotes(string):
     return string
 
 
+# How each attribute is parsed, per tag. Attributes not listed are kept as is
+STREAM_INF_ATTRIBUTE_PARSER = remove_quotes_parser('codecs', 'audio', 'video', 'subtitles')
+STREAM_INF_ATTRIBUTE_PARSER["program_id"] = int
+STREAM_INF_ATTRIBUTE_PARSER["bandwidth"] = lambda x: int(float(x))
+STREAM_INF_ATTRIBUTE_PARSER["average_bandwidth"] = int
+
+I_FRAME_STREAM_INF_ATTRIBUTE_PARSER = remove_quotes_parser('codecs', 'uri')
+I_FRAME_STREAM_INF_ATTRIBUTE_PARSER["program_id"] = int
+I_FRAME_STREAM_INF_ATTRIBUTE_PARSER["bandwidth"] = int
+
+MEDIA_ATTRIBUTE_PARSER = remove_quotes_parser('uri', 'group_id', 'language', 'name', 'characteristics')
+
+
+def key_identity(key):
+    '''
+    Returns a hashable identity for a key dictionary (as found in
+    ``parse()['keys']``), or None for the unencrypted (None) key.
+    '''
+    if key is None:
+        return None
+    return tuple(key.get(name) for name in KEY_IDENTITY_ATTRIBUTES)
+
+
 def normalize_attribute(attribute):
     return attribute.replace('-', '_').lower().strip()
 
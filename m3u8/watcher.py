@@ -0,0 +1,83 @@
+# coding: utf-8
+# Copyright 2014 Globo.com Player authors. All rights reserved.
+# Use of this source code is governed by a MIT License
+# license that can be found in the LICENSE file.
+
+import time
+
+from m3u8.loader import Loader, _clock
+from m3u8.parser import is_url
+
+
+class LivePlaylistWatcher(object):
+    '''
+    Polls a live media playlist following the reload rules of the HLS
+    specification: after a load that brought new segments the playlist is
+    reloaded one target duration after that load started, and after a load
+    that did not, half a target duration after it.
+
+    Iterating over a watcher yields the Segment objects that were not seen
+    before, as told by their media sequence numbers, and stops once the
+    playlist has an EXT-X-ENDLIST tag. If `skip_existing` is True the
+    segments in the first load are not yielded, only the ones added later.
+
+        for segment in m3u8.LivePlaylistWatcher('http://videoserver.com/live.m3u8'):
+            download(segment.absolute_uri)
+
+    URIs are loaded through `loader`, or a `Loader` with `cache` enabled,
+    so unchanged playlists are not parsed again, if None. `playlist` is
+    the M3U8 object loaded last and `next_media_sequence` the media
+    sequence number of the next segment to be yielded.
+    '''
+
+    def __init__(self, uri, loader=None, timeout=None, headers=None,
+                 skip_existing=False, clock=_clock, sleep=time.sleep):
+        self.uri = uri
+        self.loader = loader
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.skip_existing = skip_existing
+        self.playlist = None
+        self.next_media_sequence = None
+        self._clock = clock
+        self._sleep = sleep
+
+    def __iter__(self):
+        from m3u8 import load
+
+        loader = self.loader
+        own_loader = loader is None and is_url(self.uri)
+        if own_loader:
+            loader = Loader(cache=True)
+        try:
+            first_load = True
+            while True:
+                started = self._clock()
+                self.playlist = load(self.uri, self.timeout, self.headers, loader)
+                new_segments = self._new_segments(self.playlist)
+                for segment in new_segments:
+                    yield segment
+                if self.playlist.is_endlist:
+                    return
+
+                target_duration = self.playlist.target_duration or 1
+                if new_segments or first_load:
+                    reload_at = started + target_duration
+                else:
+                    reload_at = started + target_duration / 2.0
+                first_load = False
+                self._sleep(max(0, reload_at - self._clock()))
+        finally:
+            if own_loader:
+                loader.close()
+
+    def _new_segments(self, playlist):
+        first_media_sequence = playlist.media_sequence or 0
+        end_media_sequence = first_media_sequence + len(playlist.segments)
+        if self.next_media_sequence is None:
+            skip = len(playlist.segments) if self.skip_existing else 0
+            self.next_media_sequence = end_media_sequence
+        else:
+            skip = max(0, self.next_media_sequence - first_media_sequence)
+            self.next_media_sequence = max(self.next_media_sequence, end_media_sequence)
+        return list(playlist.segments[skip:])
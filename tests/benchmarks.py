@@ -0,0 +1,305 @@
+# coding: utf-8
+# Copyright 2014 Globo.com Player authors. All rights reserved.
+# Use of this source code is governed by a MIT License
+# license that can be found in the LICENSE file.
+
+# Benchmarks for the parser hot paths. They are not collected by py.test,
+# run them with:
+#
+#   ./runtests benchmark [name filter]
+#   ./runtests benchmark memory
+#
+# Every benchmark reports the best of a few runs as operations per second,
+# the latency per segment (or per variant) and the peak memory allocated
+# by a single run (python 3 only, it relies on tracemalloc).
+
+import datetime
+import functools
+import sys
+import timeit
+from os.path import dirname
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, dirname(__file__))
+
+import m3u8
+import playlists
+
+
+SCTE35 = '/DAlAAAAAAAAAP/wFAUAAAABf+//wpiQkv4ARKogAAEBAQAAQ6sodg=='
+
+
+def _header(segment_duration, version=3):
+    return ['#EXTM3U',
+            '#EXT-X-VERSION:%d' % version,
+            '#EXT-X-TARGETDURATION:%d' % segment_duration,
+            '#EXT-X-MEDIA-SEQUENCE:0']
+
+
+def ad_heavy_playlist(hours=24, segment_duration=2, break_every=60, break_length=15):
+    '''
+    Generates a live playlist with Elemental style SCTE-35 ad breaks,
+    one every `break_every` segments lasting `break_length` segments.
+    '''
+    lines = _header(segment_duration)
+    segments = int(hours * 3600 / segment_duration)
+    for i in range(segments):
+        position = i % break_every
+        if position == 0:
+            lines.append('#EXT-OATCLS-SCTE35:' + SCTE35)
+            lines.append('#EXT-X-CUE-OUT:%d.000' % (break_length * segment_duration))
+        elif position < break_length:
+            lines.append('#EXT-X-CUE-OUT-CONT:ElapsedTime=%d.000,Duration=%d,SCTE35=%s' %
+                         (position * segment_duration, break_length * segment_duration, SCTE35))
+        elif position == break_length:
+            lines.append('#EXT-X-CUE-IN')
+        lines.append('#EXTINF:%d.000,' % segment_duration)
+        lines.append('segment%d.ts' % i)
+    return '\n'.join(lines)
+
+
+def dense_scte35_playlist(hours=1, segment_duration=2):
+    '''
+    Generates a playlist where every segment carries a SCTE-35 cue,
+    alternating short ad breaks of two segments with single segments
+    of content.
+    '''
+    return ad_heavy_playlist(hours, segment_duration, break_every=3, break_length=2)
+
+
+def dvr_playlist(hours=24, segment_duration=6, start=datetime.datetime(2014, 8, 13, 13, 36, 33)):
+    '''
+    Generates a DVR window of `hours` where every segment has its own
+    EXT-X-PROGRAM-DATE-TIME, as most live packagers write them.
+    '''
+    lines = _header(segment_duration)
+    step = datetime.timedelta(seconds=segment_duration)
+    for i in range(int(hours * 3600 / segment_duration)):
+        lines.append('#EXT-X-PROGRAM-DATE-TIME:%s.000Z' % (start + i * step).strftime('%Y-%m-%dT%H:%M:%S'))
+        lines.append('#EXTINF:%d.000,' % segment_duration)
+        lines.append('segment%d.ts' % i)
+    return '\n'.join(lines)
+
+
+def key_rotation_playlist(segments=5000, segment_duration=6):
+    '''
+    Generates a playlist that rotates its AES-128 key on every segment.
+    '''
+    lines = _header(segment_duration)
+    for i in range(segments):
+        lines.append('#EXT-X-KEY:METHOD=AES-128,URI="https://keys.example.com/key%d.bin",IV=0x%032x' % (i, i))
+        lines.append('#EXTINF:%d.000,' % segment_duration)
+        lines.append('segment%d.ts' % i)
+    return '\n'.join(lines)
+
+
+def master_playlist(variants=200, iframes=True):
+    '''
+    Generates a master playlist with `variants` renditions spread across
+    a few audio and subtitle groups, and one I-frame playlist per rendition.
+    '''
+    lines = ['#EXTM3U', '#EXT-X-VERSION:6', '#EXT-X-INDEPENDENT-SEGMENTS']
+    languages = ['en', 'pt', 'es', 'fr']
+    for language in languages:
+        lines.append('#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aac",LANGUAGE="%s",NAME="%s",'
+                     'AUTOSELECT=YES,DEFAULT=%s,CHANNELS="2",URI="audio/%s.m3u8"' %
+                     (language, language, 'YES' if language == 'en' else 'NO', language))
+        lines.append('#EXT-X-MEDIA:TYPE=SUBTITLES,GROUP-ID="subs",LANGUAGE="%s",NAME="%s",'
+                     'AUTOSELECT=YES,FORCED=NO,URI="subs/%s.m3u8"' % (language, language, language))
+    for i in range(variants):
+        bandwidth = 200000 + i * 40000
+        height = (144, 240, 360, 480, 720, 1080)[i % 6]
+        resolution = '%dx%d' % (height * 16 // 9, height)
+        lines.append('#EXT-X-STREAM-INF:BANDWIDTH=%d,AVERAGE-BANDWIDTH=%d,CODECS="avc1.640028,mp4a.40.2",'
+                     'RESOLUTION=%s,FRAME-RATE=29.970,AUDIO="aac",SUBTITLES="subs"' %
+                     (bandwidth, bandwidth * 9 // 10, resolution))
+        lines.append('video/%d/index.m3u8' % i)
+        if iframes:
+            lines.append('#EXT-X-I-FRAME-STREAM-INF:BANDWIDTH=%d,CODECS="avc1.640028",'
+                         'RESOLUTION=%s,URI="video/%d/iframes.m3u8"' % (bandwidth // 10, resolution, i))
+    return '\n'.join(lines)
+
+
+def fixture_playlists():
+    '''
+    Returns every playlist in `tests/playlists.py`, covering the less
+    common tags the generators above do not write.
+    '''
+    return [value for name, value in sorted(vars(playlists).items())
+            if name.isupper() and isinstance(value, str) and '#EXTM3U' in value]
+
+
+def _peak_memory(func):
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench(name, func, items=1, number=5):
+    '''
+    Runs `func` `number` times and prints the best time as operations per
+    second, the latency per item (segments or variants) and the peak memory.
+    '''
+    best = min(timeit.repeat(func, number=1, repeat=number))
+    peak = _peak_memory(func)
+    print('%-45s %10.1f ops/s %10.2f us/item %10s' % (
+        name, 1 / best, best * 1e6 / items,
+        '-' if peak is None else '%.1f MiB' % (peak / 1048576.0)))
+
+
+def _retained_memory(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def _instance_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def memory():
+    '''
+    Prints the memory taken by each model object, and retained per segment
+    by a whole M3U8 object.
+    '''
+    playlist = m3u8.loads(dvr_playlist(segment_duration=2))
+    objects = [
+        ('Segment', playlist.segments[0]),
+        ('Key', m3u8.model.Key('AES-128', None, 'key.bin', '0x1')),
+        ('Playlist', m3u8.loads(master_playlist(1)).playlists[0]),
+        ('IFramePlaylist', m3u8.loads(master_playlist(1)).iframe_playlists[0]),
+        ('Media', m3u8.Media('audio/en.m3u8', 'AUDIO', 'aac', 'en', 'English')),
+    ]
+    for name, obj in objects:
+        print('%-45s %10d bytes' % ('%s instance' % name, _instance_size(obj)))
+    if tracemalloc is not None:
+        content = dvr_playlist(segment_duration=2)
+        for name, kwargs in (('loads', {}),
+                             ('loads, dropped data', {'drop_parsed_segments': True}),
+                             ('columnar', {'columnar': True}),
+                             ('columnar, dropped data',
+                              {'columnar': True, 'drop_parsed_segments': True})):
+            retained = _retained_memory(lambda: m3u8.M3U8(content, **kwargs))
+            print('%-45s %10d bytes' % ('%s 24h DVR, per segment' % name, retained / 43200))
+
+
+def _linear_segment_at(segments, offset):
+    # what seeking cost before SegmentList.segment_at
+    elapsed = 0
+    for segment in segments:
+        elapsed += segment.duration
+        if offset < elapsed:
+            return segment
+
+
+def _memoized(build):
+    # builds an input on first use only, and once for all the benchmarks
+    # sharing it
+    cache = []
+
+    def get():
+        if not cache:
+            cache.append(build())
+        return cache[0]
+    return get
+
+
+def _setup(inputs, func):
+    # setup of a benchmark timing func(inputs())
+    return lambda: functools.partial(func, inputs())
+
+
+def _seek_inputs():
+    segments = m3u8.loads(dvr_playlist()).segments
+    total = segments.total_duration
+    start = segments[0].program_date_time
+    offsets = [total * i / 1000.0 for i in range(1000)]
+    date_times = [start + datetime.timedelta(seconds=offset) for offset in offsets]
+    return segments, offsets, date_times
+
+
+def benchmarks():
+    '''
+    Yields (name, setup, items) for every benchmark. `setup` builds the
+    inputs of the benchmark and returns the function to time, so that only
+    the selected benchmarks pay for generating their playlists.
+    '''
+    ad_heavy = _memoized(ad_heavy_playlist)
+    cases = [
+        ('24h ad-heavy', ad_heavy, 43200),
+        ('1h dense SCTE-35', _memoized(dense_scte35_playlist), 1800),
+        ('24h DVR with PDT', _memoized(dvr_playlist), 14400),
+        ('key rotation', _memoized(key_rotation_playlist), 5000),
+        ('master with 200 variants', _memoized(master_playlist), 200),
+    ]
+    for label, content, items in cases:
+        yield 'parse %s' % label, _setup(content, m3u8.parse), items
+        yield 'loads %s' % label, _setup(content, m3u8.loads), items
+        yield ('dumps %s' % label,
+               _setup(lambda content=content: m3u8.loads(content()), m3u8.M3U8.dumps), items)
+
+    yield ('loads 24h ad-heavy, lazy',
+           _setup(ad_heavy, functools.partial(m3u8.loads, lazy=True)), 43200)
+    yield ('loads 24h ad-heavy, columnar',
+           _setup(ad_heavy, functools.partial(m3u8.loads, columnar=True)), 43200)
+    yield ('loads 24h ad-heavy, last 3',
+           _setup(ad_heavy, functools.partial(m3u8.loads, last_segments=3)), 43200)
+    yield 'loads_header 24h ad-heavy', _setup(ad_heavy, m3u8.loads_header), 43200
+
+    for columnar in (False, True):
+        segments = _memoized(lambda columnar=columnar:
+                             m3u8.loads(ad_heavy(), columnar=columnar).segments)
+        label = 'columnar' if columnar else 'list'
+        yield ('total_duration 24h ad-heavy, %s' % label,
+               _setup(segments, lambda segments: segments.total_duration), 43200)
+        yield ('by_key 24h ad-heavy, %s' % label,
+               _setup(segments, lambda segments: segments.by_key(None)), 43200)
+        yield ('iterate 24h ad-heavy, %s' % label,
+               _setup(segments, lambda segments: [s.uri for s in segments]), 43200)
+        yield ('to_arrays 24h ad-heavy, %s' % label,
+               _setup(segments, lambda segments: segments.to_arrays()), 43200)
+
+    seek_inputs = _memoized(_seek_inputs)
+    yield ('1000 segment_at 24h DVR with PDT',
+           _setup(seek_inputs, lambda inputs: [inputs[0].segment_at(offset)
+                                               for offset in inputs[1]]), 1000)
+    yield ('1000 segment_at_datetime 24h DVR with PDT',
+           _setup(seek_inputs, lambda inputs: [inputs[0].segment_at_datetime(date_time)
+                                               for date_time in inputs[2]]), 1000)
+    yield ('10 linear seeks 24h DVR with PDT',
+           _setup(seek_inputs, lambda inputs: [_linear_segment_at(inputs[0], offset)
+                                               for offset in inputs[1][::100]]), 10)
+
+    # the fixtures are small, their count is needed up front
+    fixtures = fixture_playlists()
+    yield ('loads tests/playlists.py fixtures',
+           _setup(lambda: fixtures, lambda fixtures: [m3u8.loads(f) for f in fixtures]),
+           len(fixtures))
+
+
+def main(args):
+    if args == ['memory']:
+        memory()
+        return
+    for name, setup, items in benchmarks():
+        if all(arg in name for arg in args):
+            bench(name, setup(), items)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
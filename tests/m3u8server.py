@@ -7,16 +7,45 @@
 
 from os.path import dirname, abspath, join
 
-from bottle import route, run, response, redirect
+from collections import defaultdict
+
+from bottle import route, run, request, response, redirect, hook, abort, static_file
 import bottle
+import gzip
+import io
 import time
+import zlib
 
 playlists = abspath(join(dirname(__file__), 'playlists'))
 
+requests_count = defaultdict(int)
+
+@hook('before_request')
+def count_request():
+    requests_count[request.path] += 1
+
+@route('/requests_count/<path:path>')
+def requests_count_for(path):
+    return str(requests_count['/' + path])
+
 @route('/path/to/redirect_me')
 def simple():
     redirect('/simple.m3u8')
 
+@route('/path/to/redirect_nowhere')
+def redirect_nowhere():
+    response.status = 302
+    return ''
+
+@route('/early_hints.m3u8')
+def early_hints():
+    # an interim response written on the socket before the final one
+    connection = request.environ['wsgi.input'].raw._sock
+    connection.sendall(b'HTTP/1.1 103 Early Hints\r\n'
+                       b'Link: </simple.m3u8>; rel=preload\r\n\r\n')
+    response.set_header('Content-Type', 'application/vnd.apple.mpegurl')
+    return m3u8_file('simple-playlist.m3u8')
+
 @route('/simple.m3u8')
 def simple():
     response.set_header('Content-Type', 'application/vnd.apple.mpegurl')
@@ -28,6 +57,55 @@ def simple():
     response.set_header('Content-Type', 'application/vnd.apple.mpegurl')
     return m3u8_file('simple-playlist.m3u8')
 
+@route('/protected.m3u8')
+def protected():
+    if request.get_header('X-Token') != 'secret':
+        abort(403, 'Forbidden')
+    response.set_header('Content-Type', 'application/vnd.apple.mpegurl')
+    return m3u8_file('simple-playlist.m3u8')
+
+@route('/cacheable.m3u8')
+def cacheable():
+    return static_file('simple-playlist.m3u8', root=playlists,
+                       mimetype='application/vnd.apple.mpegurl')
+
+@route('/compressed/<encoding>.m3u8')
+def compressed(encoding):
+    content_encoding = 'deflate' if encoding == 'raw-deflate' else encoding
+    if content_encoding not in request.get_header('Accept-Encoding', ''):
+        abort(406, 'Not Acceptable')
+    content = m3u8_file('simple-playlist.m3u8').encode('utf-8')
+    if encoding == 'gzip':
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as fileobj:
+            fileobj.write(content)
+        content = buffer.getvalue()
+    elif encoding == 'deflate':
+        content = zlib.compress(content)
+    elif encoding == 'raw-deflate':
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        content = compressor.compress(content) + compressor.flush()
+    response.set_header('Content-Type', 'application/vnd.apple.mpegurl')
+    response.set_header('Content-Encoding', content_encoding)
+    return content
+
+@route('/flaky/<key>/<failures:int>.m3u8')
+def flaky(key, failures):
+    # fails the first `failures` requests of each key
+    if requests_count[request.path] <= failures:
+        response.set_header('Retry-After', '0')
+        abort(503, 'Service Unavailable')
+    response.set_header('Content-Type', 'application/vnd.apple.mpegurl')
+    return m3u8_file('simple-playlist.m3u8')
+
+@route('/slow/<key>/<slow_requests:int>.m3u8')
+def slow(key, slow_requests):
+    # the first `slow_requests` requests of each key take a second
+    if requests_count[request.path] <= slow_requests:
+        time.sleep(1)
+    response.set_header('Content-Type', 'application/vnd.apple.mpegurl')
+    return m3u8_file('simple-playlist.m3u8')
+
 @route('/path/to/relative-playlist.m3u8')
 def simple():
     response.set_header('Content-Type', 'application/vnd.apple.mpegurl')
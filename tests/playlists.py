@@ -21,6 +21,14 @@ SIMPLE_PLAYLIST_FILENAME = abspath(
 SIMPLE_PLAYLIST_URI = TEST_HOST + '/simple.m3u8'
 TIMEOUT_SIMPLE_PLAYLIST_URI = TEST_HOST + '/timeout_simple.m3u8'
 REDIRECT_PLAYLIST_URI = TEST_HOST + '/path/to/redirect_me'
+REDIRECT_WITHOUT_LOCATION_URI = TEST_HOST + '/path/to/redirect_nowhere'
+EARLY_HINTS_PLAYLIST_URI = TEST_HOST + '/early_hints.m3u8'
+REQUESTS_COUNT_URI = TEST_HOST + '/requests_count'
+PROTECTED_PLAYLIST_URI = TEST_HOST + '/protected.m3u8'
+CACHEABLE_PLAYLIST_URI = TEST_HOST + '/cacheable.m3u8'
+COMPRESSED_PLAYLIST_URI = TEST_HOST + '/compressed/%s.m3u8'
+FLAKY_PLAYLIST_URI = TEST_HOST + '/flaky/%s/%d.m3u8'
+SLOW_PLAYLIST_URI = TEST_HOST + '/slow/%s/%d.m3u8'
 
 
 PLAYLIST_WITH_NON_INTEGER_DURATION = '''
@@ -583,6 +591,17 @@ CUE_OUT_ENVIVIO_PLAYLIST = '''
 20160914T080055-master804-199/1710.ts
 '''
 
+PLAYLIST_WITH_DISCONTINUITY_SEQUENCE = '''
+#EXTM3U
+#EXT-X-TARGETDURATION:10
+#EXT-X-DISCONTINUITY-SEQUENCE:3
+#EXTINF:10,
+segment1.ts
+#EXT-X-DISCONTINUITY
+#EXTINF:10,
+segment2.ts
+'''
+
 MULTI_MEDIA_PLAYLIST = '''#EXTM3U
 #EXT-X-VERSION:3
 #EXT-X-MEDIA:URI="en/chunklist_w370587926_b160000_ao_slen_t64RW5nbGlzaA==.m3u8",TYPE=AUDIO,GROUP-ID="aac",LANGUAGE="en",NAME="English",DEFAULT=YES,AUTOSELECT=YES
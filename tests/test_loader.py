@@ -8,11 +8,30 @@ try:
     import urlparse as url_parser
 except ImportError:
     import urllib.parse as url_parser
+import gzip
+import io
+import socket
+import threading
+import time
+import uuid
+try:
+    from urllib.request import urlopen
+    from urllib.error import HTTPError
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from urllib2 import urlopen, HTTPError
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
 import m3u8
 import pytest
 import playlists
 
 
+def requests_count(path):
+    return int(urlopen(playlists.REQUESTS_COUNT_URI + path).read())
+
+
 def test_loads_should_create_object_from_string():
     obj = m3u8.loads(playlists.SIMPLE_PLAYLIST)
     assert isinstance(obj, m3u8.M3U8)
@@ -20,6 +39,20 @@ def test_loads_should_create_object_from_string():
     assert 'http://media.example.com/entire.ts' == obj.segments[0].uri
 
 
+def test_loads_should_parse_only_last_segments():
+    obj = m3u8.loads(playlists.SLIDING_WINDOW_PLAYLIST, last_segments=1)
+    assert 2682 == obj.media_sequence
+    assert ['https://priv.example.com/fileSequence2682.ts'] == obj.segments.uri
+
+
+def test_loads_header_should_read_only_playlist_attributes():
+    data = m3u8.loads_header(playlists.SIMPLE_PLAYLIST)
+    assert 5220 == data['targetduration']
+    assert 1 == data['segment_count']
+    assert 5220 == data['total_duration']
+    assert 'segments' not in data
+
+
 def test_load_should_create_object_from_file():
     obj = m3u8.load(playlists.SIMPLE_PLAYLIST_FILENAME)
     assert isinstance(obj, m3u8.M3U8)
@@ -27,6 +60,50 @@ def test_load_should_create_object_from_file():
     assert 'http://media.example.com/entire.ts' == obj.segments[0].uri
 
 
+def test_load_should_read_files_with_any_line_terminator(tmpdir):
+    for newline in ('\r\n', '\r'):
+        path = tmpdir.join('playlist.m3u8')
+        path.write_binary(playlists.SIMPLE_PLAYLIST.replace('\n', newline).encode('utf-8'))
+        obj = m3u8.load(str(path))
+        assert 5220 == obj.target_duration
+        assert 'http://media.example.com/entire.ts' == obj.segments[0].uri
+
+
+def test_load_should_read_empty_files(tmpdir):
+    path = tmpdir.join('empty.m3u8')
+    path.write_binary(b'')
+    assert [] == m3u8.load(str(path)).segments
+
+
+def write_playlists(tmpdir):
+    tmpdir.join('simple.m3u8').write_binary(playlists.SIMPLE_PLAYLIST.encode('utf-8'))
+    tmpdir.join('notes.txt').write_binary(b'not a playlist')
+    tmpdir.mkdir('live').join('sliding.m3u8').write_binary(
+        playlists.SLIDING_WINDOW_PLAYLIST.encode('utf-8'))
+    tmpdir.join('live', 'broken.m3u8').write_binary(b'#EXTM3U\n#EXTINF:\xff\n')
+    return dict((name, str(tmpdir.join(*name.split('/'))))
+                for name in ('simple.m3u8', 'live/sliding.m3u8', 'live/broken.m3u8'))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_load_directory_should_load_matching_files(tmpdir, workers):
+    paths = write_playlists(tmpdir)
+    results = dict(m3u8.load_directory(str(tmpdir), workers=workers))
+
+    assert sorted(paths.values()) == sorted(results)
+    assert 5220 == results[paths['simple.m3u8']].target_duration
+    assert 2680 == results[paths['live/sliding.m3u8']].media_sequence
+    assert isinstance(results[paths['live/broken.m3u8']], UnicodeDecodeError)
+
+
+def test_load_directory_should_yield_summaries(tmpdir):
+    paths = write_playlists(tmpdir)
+    results = dict(m3u8.load_directory(str(tmpdir), pattern='s*.m3u8', workers=2, summary=True))
+
+    assert [paths['live/sliding.m3u8'], paths['simple.m3u8']] == sorted(results)
+    assert m3u8.loads_header(playlists.SLIDING_WINDOW_PLAYLIST) == results[paths['live/sliding.m3u8']]
+
+
 def test_load_should_create_object_from_uri():
     obj = m3u8.load(playlists.SIMPLE_PLAYLIST_URI)
     assert isinstance(obj, m3u8.M3U8)
@@ -40,6 +117,497 @@ def test_load_should_remember_redirect():
     assert urlparsed.scheme + '://' + urlparsed.netloc + "/" == obj.base_uri
 
 
+def test_load_should_request_uri_only_once():
+    redirects, playlist = requests_count('/path/to/redirect_me'), requests_count('/simple.m3u8')
+    m3u8.load(playlists.REDIRECT_PLAYLIST_URI)
+    assert redirects + 1 == requests_count('/path/to/redirect_me')
+    assert playlist + 1 == requests_count('/simple.m3u8')
+
+
+def test_load_with_loader_should_create_object_from_uri():
+    with m3u8.Loader() as loader:
+        obj = m3u8.load(playlists.SIMPLE_PLAYLIST_URI, loader=loader)
+    assert 5220 == obj.target_duration
+    assert 'http://media.example.com/entire.ts' == obj.segments[0].uri
+
+
+def test_load_with_loader_should_remember_redirect():
+    with m3u8.Loader() as loader:
+        obj = m3u8.load(playlists.REDIRECT_PLAYLIST_URI, loader=loader)
+    urlparsed = url_parser.urlparse(playlists.SIMPLE_PLAYLIST_URI)
+    assert urlparsed.scheme + '://' + urlparsed.netloc + "/" == obj.base_uri
+
+
+def test_load_with_loader_should_fail_on_redirect_without_location():
+    with pytest.raises(HTTPError) as e:
+        with m3u8.Loader() as loader:
+            m3u8.load(playlists.REDIRECT_WITHOUT_LOCATION_URI, loader=loader)
+    assert 302 == e.value.code
+    assert 'Redirect without Location' == e.value.msg
+
+
+def test_load_with_loader_should_send_headers():
+    with m3u8.Loader(headers={'X-Token': 'secret'}) as loader:
+        obj = m3u8.load(playlists.PROTECTED_PLAYLIST_URI, loader=loader)
+    assert 5220 == obj.target_duration
+
+    with m3u8.Loader() as loader:
+        obj = m3u8.load(playlists.PROTECTED_PLAYLIST_URI, headers={'X-Token': 'secret'}, loader=loader)
+    assert 5220 == obj.target_duration
+
+    with pytest.raises(HTTPError) as e:
+        with m3u8.Loader() as loader:
+            m3u8.load(playlists.PROTECTED_PLAYLIST_URI, loader=loader)
+    assert 403 == e.value.code
+
+
+def test_load_with_loader_should_honour_timeout():
+    with pytest.raises(Exception):
+        with m3u8.Loader(timeout=1) as loader:
+            m3u8.load(playlists.TIMEOUT_SIMPLE_PLAYLIST_URI, loader=loader)
+
+
+class KeepAliveServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('localhost', 0), KeepAliveHandler)
+        self.connections = 0
+        self.keep_alive = True
+        self.content = playlists.SIMPLE_PLAYLIST
+        self.contents = {}
+        self.last_modified = None
+        self.delay = 0
+        self.active = self.max_active = 0
+        self.lock = threading.Lock()
+        self.uri = 'http://localhost:%d' % self.server_address[1]
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.active, server.max_active)
+        try:
+            time.sleep(server.delay)
+            self.respond()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def respond(self):
+        if self.path == '/missing.m3u8':
+            self.send_error(404)
+            return
+        last_modified = self.server.last_modified
+        if last_modified and self.headers.get('If-Modified-Since') == last_modified:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.server.contents.get(self.path, self.server.content).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+        self.send_header('Content-Length', str(len(body)))
+        if last_modified:
+            self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+        # simulates servers dropping idle connections
+        self.close_connection = not self.server.keep_alive
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def keep_alive_server():
+    server = KeepAliveServer()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_loader_should_reuse_connections(keep_alive_server):
+    with m3u8.Loader() as loader:
+        for i in range(5):
+            obj = m3u8.load(keep_alive_server.uri + '/simple.m3u8', loader=loader)
+            assert 5220 == obj.target_duration
+    assert 1 == keep_alive_server.connections
+
+
+def test_loader_should_reconnect_when_idle_connection_was_closed(keep_alive_server):
+    keep_alive_server.keep_alive = False
+    with m3u8.Loader() as loader:
+        m3u8.load(keep_alive_server.uri + '/simple.m3u8', loader=loader)
+        obj = m3u8.load(keep_alive_server.uri + '/simple.m3u8', loader=loader)
+    assert 5220 == obj.target_duration
+    assert 2 == keep_alive_server.connections
+
+
+def test_loader_with_cache_should_return_same_object_when_not_modified():
+    with m3u8.Loader(cache=True) as loader:
+        obj = m3u8.load(playlists.CACHEABLE_PLAYLIST_URI, loader=loader)
+        requests = requests_count('/cacheable.m3u8')
+        assert obj is m3u8.load(playlists.CACHEABLE_PLAYLIST_URI, loader=loader)
+        assert requests + 1 == requests_count('/cacheable.m3u8')
+
+
+def test_loader_without_cache_should_parse_every_load():
+    with m3u8.Loader() as loader:
+        obj = m3u8.load(playlists.CACHEABLE_PLAYLIST_URI, loader=loader)
+        assert obj is not m3u8.load(playlists.CACHEABLE_PLAYLIST_URI, loader=loader)
+
+
+def test_loader_with_cache_should_reload_modified_playlists(keep_alive_server):
+    uri = keep_alive_server.uri + '/live.m3u8'
+    keep_alive_server.last_modified = 'Wed, 13 Aug 2014 13:36:33 GMT'
+    with m3u8.Loader(cache=True) as loader:
+        obj = m3u8.load(uri, loader=loader)
+        assert obj is m3u8.load(uri, loader=loader)
+
+        keep_alive_server.content = playlists.SLIDING_WINDOW_PLAYLIST
+        keep_alive_server.last_modified = 'Wed, 13 Aug 2014 13:36:39 GMT'
+        new_obj = m3u8.load(uri, loader=loader)
+        assert new_obj is not obj
+        assert 2680 == new_obj.media_sequence
+        assert new_obj is m3u8.load(uri, loader=loader)
+
+
+requires_asyncio = pytest.mark.skipif(not hasattr(m3u8, 'async_load'),
+                                      reason='asyncio is not available')
+
+
+def run(coroutine):
+    import asyncio
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@requires_asyncio
+def test_async_load_should_create_same_object_as_load(keep_alive_server):
+    uri = keep_alive_server.uri + '/simple.m3u8'
+    obj = run(m3u8.async_load(uri))
+    assert isinstance(obj, m3u8.M3U8)
+    assert m3u8.load(uri).dumps() == obj.dumps()
+    assert m3u8.load(uri).base_uri == obj.base_uri
+
+
+@requires_asyncio
+def test_async_load_should_remember_redirect():
+    obj = run(m3u8.async_load(playlists.REDIRECT_PLAYLIST_URI))
+    urlparsed = url_parser.urlparse(playlists.SIMPLE_PLAYLIST_URI)
+    assert urlparsed.scheme + '://' + urlparsed.netloc + "/" == obj.base_uri
+
+
+@requires_asyncio
+def test_async_load_should_skip_interim_responses():
+    obj = run(m3u8.async_load(playlists.EARLY_HINTS_PLAYLIST_URI))
+    assert 5220 == obj.target_duration
+    assert 'http://media.example.com/entire.ts' == obj.segments[0].uri
+
+
+@requires_asyncio
+def test_async_load_should_fail_on_redirect_without_location():
+    with pytest.raises(HTTPError) as e:
+        run(m3u8.async_load(playlists.REDIRECT_WITHOUT_LOCATION_URI))
+    assert 302 == e.value.code
+    assert 'Redirect without Location' == e.value.msg
+
+
+@requires_asyncio
+def test_async_load_should_send_headers():
+    obj = run(m3u8.async_load(playlists.PROTECTED_PLAYLIST_URI, headers={'X-Token': 'secret'}))
+    assert 5220 == obj.target_duration
+    with pytest.raises(HTTPError) as e:
+        run(m3u8.async_load(playlists.PROTECTED_PLAYLIST_URI))
+    assert 403 == e.value.code
+
+
+@requires_asyncio
+def test_async_load_should_create_object_from_file():
+    obj = run(m3u8.async_load(playlists.RELATIVE_PLAYLIST_FILENAME))
+    assert m3u8.load(playlists.RELATIVE_PLAYLIST_FILENAME).dumps() == obj.dumps()
+
+
+@requires_asyncio
+def test_async_load_should_honour_timeout(keep_alive_server):
+    import asyncio
+    keep_alive_server.delay = 1
+    with pytest.raises(asyncio.TimeoutError):
+        run(m3u8.async_load(keep_alive_server.uri + '/simple.m3u8', timeout=0.1))
+
+
+@requires_asyncio
+def test_load_many_should_bound_concurrency(keep_alive_server):
+    keep_alive_server.delay = 0.05
+    uris = [keep_alive_server.uri + '/%d/simple.m3u8' % i for i in range(12)]
+    objs = run(m3u8.load_many(uris, concurrency=3))
+    assert ['%s/%d/' % (keep_alive_server.uri, i) for i in range(12)] == [obj.base_uri for obj in objs]
+    assert 3 == keep_alive_server.max_active
+
+
+@requires_asyncio
+def test_load_many_should_return_exceptions_in_place(keep_alive_server):
+    uris = [keep_alive_server.uri + '/simple.m3u8', keep_alive_server.uri + '/missing.m3u8']
+    obj, error = run(m3u8.load_many(uris, return_exceptions=True))
+    assert 5220 == obj.target_duration
+    assert 404 == error.code
+
+    with pytest.raises(HTTPError):
+        run(m3u8.load_many(uris))
+
+
+@requires_asyncio
+def test_async_read_body_should_decompress_chunks_as_they_arrive():
+    import asyncio
+    from m3u8 import aio
+    content = playlists.SLIDING_WINDOW_PLAYLIST.encode('utf-8') * 100
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as fileobj:
+        fileobj.write(content)
+    compressed = buffer.getvalue()
+    pieces = [compressed[i:i + 7] for i in range(0, len(compressed), 7)]
+
+    async def read(data, read_body):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_body(reader, m3u8.loader._decompressor('gzip'))
+
+    chunked = b''.join(b'%x\r\n' % len(piece) + piece + b'\r\n' for piece in pieces) + b'0\r\n\r\n'
+    assert content == run(read(chunked, aio._read_chunked))
+    assert content == run(read(compressed, lambda reader, decompressor:
+                                aio._read_body(reader, decompressor, len(compressed))))
+    assert content == run(read(compressed, lambda reader, decompressor:
+                                aio._read_body(reader, decompressor, None)))
+
+
+def test_resolve_should_load_every_child_playlist(keep_alive_server):
+    keep_alive_server.contents['/master.m3u8'] = playlists.MULTI_MEDIA_PLAYLIST
+    keep_alive_server.delay = 0.05
+    master = m3u8.resolve(keep_alive_server.uri + '/master.m3u8', concurrency=3)
+
+    references = list(master.playlists) + list(master.media)
+    assert 7 == len(references)
+    for reference in references:
+        assert isinstance(reference.media_playlist, m3u8.M3U8)
+        assert 5220 == reference.media_playlist.target_duration
+    for media in master.playlists[0].media:
+        assert isinstance(media.media_playlist, m3u8.M3U8)
+    assert 3 == keep_alive_server.max_active
+
+
+def test_resolve_should_resolve_nested_master_playlists_once(keep_alive_server):
+    keep_alive_server.contents['/master.m3u8'] = playlists.MULTI_MEDIA_PLAYLIST
+    keep_alive_server.contents['/nested.m3u8'] = (
+        '#EXTM3U\n'
+        '#EXT-X-STREAM-INF:BANDWIDTH=1280000\nmaster.m3u8\n'
+        '#EXT-X-STREAM-INF:BANDWIDTH=2560000\nnested.m3u8\n')
+    master = m3u8.loads(keep_alive_server.contents['/nested.m3u8'])
+    master.base_uri = keep_alive_server.uri + '/'
+
+    with m3u8.Loader() as loader:
+        assert master is m3u8.resolve(master, loader=loader)
+    nested = master.playlists[0].media_playlist
+    assert nested.is_variant
+    assert 5220 == nested.playlists[0].media_playlist.target_duration
+    # every uri is loaded once, so the cycle ends on the same object
+    itself = master.playlists[1].media_playlist
+    assert itself.playlists[1].media_playlist is itself
+    assert itself.playlists[0].media_playlist is nested
+
+
+def test_resolve_should_raise_or_return_errors(keep_alive_server):
+    keep_alive_server.contents['/master.m3u8'] = (
+        '#EXTM3U\n'
+        '#EXT-X-STREAM-INF:BANDWIDTH=1280000\nsimple.m3u8\n'
+        '#EXT-X-STREAM-INF:BANDWIDTH=2560000\nmissing.m3u8\n')
+    with pytest.raises(HTTPError):
+        m3u8.resolve(keep_alive_server.uri + '/master.m3u8')
+
+    master = m3u8.resolve(keep_alive_server.uri + '/master.m3u8', return_exceptions=True)
+    assert 5220 == master.playlists[0].media_playlist.target_duration
+    assert 404 == master.playlists[1].media_playlist.code
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'deflate', 'raw-deflate'])
+def test_load_should_decompress_playlists(encoding):
+    expected = m3u8.load(playlists.SIMPLE_PLAYLIST_URI).dumps()
+    uri = playlists.COMPRESSED_PLAYLIST_URI % encoding
+    assert expected == m3u8.load(uri).dumps()
+    with m3u8.Loader() as loader:
+        assert expected == m3u8.load(uri, loader=loader).dumps()
+    if hasattr(m3u8, 'async_load'):
+        assert expected == run(m3u8.async_load(uri)).dumps()
+
+
+def test_load_should_not_override_accept_encoding():
+    with pytest.raises(HTTPError) as e:
+        m3u8.load(playlists.COMPRESSED_PLAYLIST_URI % 'gzip', headers={'accept-encoding': 'identity'})
+    assert 406 == e.value.code
+
+
+def test_read_body_should_decompress_across_chunks():
+    content = playlists.SLIDING_WINDOW_PLAYLIST.encode('utf-8') * 100
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as fileobj:
+        fileobj.write(content)
+    buffer.seek(0)
+    assert content == m3u8.loader._read_body(buffer, 'gzip', chunk_size=7)
+
+
+def test_loader_should_retry_transient_errors():
+    uri = playlists.FLAKY_PLAYLIST_URI % (uuid.uuid4().hex, 2)
+    with m3u8.Loader(retry=m3u8.RetryPolicy(retries=2, backoff=0.01)) as loader:
+        obj = m3u8.load(uri, loader=loader)
+    assert 5220 == obj.target_duration
+    assert 3 == requests_count(url_parser.urlparse(uri).path)
+
+
+def test_loader_should_give_up_after_retries():
+    uri = playlists.FLAKY_PLAYLIST_URI % (uuid.uuid4().hex, 2)
+    with pytest.raises(HTTPError) as e:
+        with m3u8.Loader(retry=m3u8.RetryPolicy(retries=1, backoff=0.01)) as loader:
+            m3u8.load(uri, loader=loader)
+    assert 503 == e.value.code
+    assert 2 == requests_count(url_parser.urlparse(uri).path)
+
+
+def test_loader_should_not_retry_client_errors():
+    path = '/missing/%s.m3u8' % uuid.uuid4().hex
+    with pytest.raises(HTTPError) as e:
+        with m3u8.Loader(retry=m3u8.RetryPolicy(backoff=0.01)) as loader:
+            m3u8.load(playlists.TEST_HOST + path, loader=loader)
+    assert 404 == e.value.code
+    assert 1 == requests_count(path)
+
+
+def test_loader_should_retry_timeouts():
+    uri = playlists.SLOW_PLAYLIST_URI % (uuid.uuid4().hex, 1)
+    with pytest.raises(socket.timeout):
+        with m3u8.Loader(timeout=0.5) as loader:
+            m3u8.load(uri, loader=loader)
+
+    uri = playlists.SLOW_PLAYLIST_URI % (uuid.uuid4().hex, 1)
+    retry = m3u8.RetryPolicy(retries=1, backoff=0.6, jitter=False)
+    with m3u8.Loader(timeout=0.5, retry=retry) as loader:
+        assert 5220 == m3u8.load(uri, loader=loader).target_duration
+
+
+def test_retry_policy_should_back_off_exponentially():
+    retry = m3u8.RetryPolicy(backoff=0.5, max_backoff=3, jitter=False)
+    error = socket.timeout()
+    assert [0.5, 1, 2, 3, 3] == [retry.delay(error, attempt) for attempt in range(5)]
+
+    retry.jitter = True
+    for attempt in range(5):
+        assert 0 <= retry.delay(error, attempt) <= min(3, 0.5 * 2 ** attempt)
+
+
+def test_retry_policy_should_honour_retry_after():
+    retry = m3u8.RetryPolicy(backoff=0.5, max_backoff=10, jitter=False)
+    error = HTTPError('http://example.com', 503, 'Service Unavailable', {'Retry-After': '4'}, None)
+    assert 4 == retry.delay(error, 0)
+    error = HTTPError('http://example.com', 503, 'Service Unavailable', {'Retry-After': '60'}, None)
+    assert 10 == retry.delay(error, 0)
+
+
+def test_rate_limiter_should_allow_bursts_and_then_rate_requests_per_host():
+    now, sleeps = [0.0], []
+    limiter = m3u8.RateLimiter(rate=2, burst=2, clock=lambda: now[0], sleep=sleeps.append)
+    for i in range(4):
+        limiter.acquire('example.com')
+    limiter.acquire('example.org')
+    assert [0.5, 1.0] == sleeps
+
+    now[0] = 10.0
+    limiter.acquire('example.com')
+    assert [0.5, 1.0] == sleeps
+
+
+def test_loader_should_rate_limit_requests(keep_alive_server):
+    with m3u8.Loader(rate_limiter=m3u8.RateLimiter(rate=20)) as loader:
+        start = time.time()
+        for i in range(3):
+            m3u8.load(keep_alive_server.uri + '/simple.m3u8', loader=loader)
+        assert time.time() - start >= 0.09
+
+
+def live_playlist(media_sequence, segments, endlist=False):
+    lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:10', '#EXT-X-MEDIA-SEQUENCE:%d' % media_sequence]
+    for sequence in range(media_sequence, media_sequence + segments):
+        lines += ['#EXTINF:10,', 'segment%d.ts' % sequence]
+    if endlist:
+        lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines)
+
+
+def watch(server, versions, **kwargs):
+    '''
+    Watches a playlist served by `server` which changes to the next of
+    `versions` every time the watcher sleeps, returning the uris of the
+    segments yielded and the times the watcher slept.
+    '''
+    versions = list(versions)
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        server.content = versions.pop(0)
+
+    server.content = versions.pop(0)
+    kwargs.setdefault('clock', lambda: 100.0)
+    watcher = m3u8.LivePlaylistWatcher(server.uri + '/live.m3u8', sleep=sleep, **kwargs)
+    return [segment.uri for segment in watcher], waits
+
+
+def test_live_playlist_watcher_should_yield_new_segments_until_endlist(keep_alive_server):
+    uris, waits = watch(keep_alive_server, [live_playlist(0, 3),
+                                            live_playlist(0, 3),
+                                            live_playlist(1, 3),
+                                            live_playlist(3, 3),
+                                            live_playlist(4, 3, endlist=True)])
+    assert ['segment%d.ts' % i for i in range(7)] == uris
+    # target duration after changes, half of it when unchanged
+    assert [10, 5, 10, 10] == waits
+
+
+def test_live_playlist_watcher_should_skip_existing_segments(keep_alive_server):
+    uris, waits = watch(keep_alive_server, [live_playlist(0, 3),
+                                            live_playlist(1, 3, endlist=True)],
+                        skip_existing=True)
+    assert ['segment3.ts'] == uris
+    assert [10] == waits
+
+
+def test_live_playlist_watcher_should_not_wait_for_ended_playlists(keep_alive_server):
+    uris, waits = watch(keep_alive_server, [live_playlist(5, 2, endlist=True)])
+    assert ['segment5.ts', 'segment6.ts'] == uris
+    assert [] == waits
+
+
+def test_live_playlist_watcher_should_measure_reloads_from_load_start(keep_alive_server):
+    # each load starts at the first time and ends at the second one
+    times = iter([0, 4, 10, 13])
+    uris, waits = watch(keep_alive_server, [live_playlist(0, 1),
+                                            live_playlist(0, 2, endlist=True)],
+                        clock=lambda: next(times))
+    assert [6] == waits
+
+
 def test_load_should_create_object_from_file_with_relative_segments():
     base_uri = os.path.dirname(playlists.RELATIVE_PLAYLIST_FILENAME)
     obj = m3u8.load(playlists.RELATIVE_PLAYLIST_FILENAME)
@@ -9,8 +9,10 @@
 import arrow
 import datetime
 import m3u8
+import pickle
 import playlists
-from m3u8.model import Segment, Key
+import pytest
+from m3u8.model import Segment, Key, SegmentList, ColumnarSegmentList
 
 
 def test_target_duration_attribute():
@@ -197,6 +199,23 @@ def test_segment_attribute_with_multiple_keys():
     assert segments[5].key.uri == '/hls-key/key2.bin'
 
 
+def test_segments_should_share_the_key_objects_from_keys():
+    obj = m3u8.M3U8(playlists.PLAYLIST_WITH_MULTIPLE_KEYS_UNENCRYPTED_AND_ENCRYPTED)
+
+    assert obj.segments[0].key is None
+    assert obj.segments[2].key is obj.keys[1]
+    assert obj.segments[-1].key is obj.keys[2]
+
+
+def test_equal_keys_should_have_the_same_hash():
+    key = Key('AES-128', None, '/hls-key/key.bin', iv='0X10ef8f758ca555115584bb5b3c687f52')
+    same_key = Key('AES-128', None, '/hls-key/key.bin', iv='0X10ef8f758ca555115584bb5b3c687f52')
+    other_key = Key('AES-128', None, '/hls-key/key2.bin', iv='0X10ef8f758ca555115584bb5b3c687f52')
+
+    assert hash(key) == hash(same_key)
+    assert 2 == len(set([key, same_key, other_key]))
+
+
 def test_is_variant_attribute():
     obj = m3u8.M3U8(playlists.SIMPLE_PLAYLIST)
     mock_parser_data(obj, {'is_variant': False})
@@ -690,6 +709,427 @@ def test_m3u8_should_propagate_base_uri_to_key():
     assert '/any/key.bin' == obj.keys[0].absolute_uri
 
 
+def test_parsed_segments_should_be_kept_in_data():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs)
+        obj._initialize_attributes()
+
+        assert 3 == len(obj.data['segments'])
+        assert 3 == len(obj.segments)
+
+
+def test_parsed_segments_should_be_dropped_from_data_if_asked():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, drop_parsed_segments=True, **kwargs)
+
+        assert 'segments' not in obj.data
+        assert 3 == len(obj.segments)
+
+    data = m3u8.parse(playlists.SLIDING_WINDOW_PLAYLIST)
+    obj = m3u8.M3U8(drop_parsed_segments=True)
+    mock_parser_data(obj, data)
+
+    assert 3 == len(data['segments'])
+    assert 3 == len(obj.segments)
+
+
+def test_lazy_segments_should_be_created_only_when_accessed():
+    obj = m3u8.M3U8(playlists.PLAYLIST_WITH_MULTIPLE_KEYS_UNENCRYPTED_AND_ENCRYPTED, lazy=True)
+
+    assert 8 == len(obj.segments)
+    assert not any(isinstance(item, Segment) for item in list.__iter__(obj.segments))
+
+    last_segment = obj.segments[-1]
+    assert '../../../../hls/streamNum82405.ts' == last_segment.uri
+    assert last_segment.key is obj.keys[2]
+    assert 1 == sum(isinstance(item, Segment) for item in list.__iter__(obj.segments))
+    assert last_segment is obj.segments[-1]
+
+
+def test_lazy_segments_should_behave_as_eager_segments():
+    content = playlists.PLAYLIST_WITH_MULTIPLE_KEYS_UNENCRYPTED_AND_ENCRYPTED
+    lazy = m3u8.M3U8(content, lazy=True)
+    eager = m3u8.M3U8(content)
+
+    assert eager.files == lazy.files
+    assert eager.dumps() == lazy.dumps()
+    assert [s.uri for s in eager.segments[2:4]] == [s.uri for s in lazy.segments[2:4]]
+    assert len(eager.segments.by_key(eager.keys[1])) == len(lazy.segments.by_key(lazy.keys[1]))
+
+
+@pytest.mark.parametrize('kwargs', [{'lazy': True}, {'columnar': True}])
+def test_lazy_and_columnar_segments_should_apply_base_path_as_eager_segments(kwargs):
+    content = playlists.PLAYLIST_WITH_ENCRIPTED_SEGMENTS_AND_IV
+    eager = m3u8.M3U8(content, base_path='/base/path', base_uri='http://example.com/')
+    obj = m3u8.M3U8(content, base_path='/base/path', base_uri='http://example.com/', **kwargs)
+
+    assert eager.files == obj.files
+    assert eager.dumps() == obj.dumps()
+
+    eager.base_path = obj.base_path = '/other/path'
+    assert eager.files == obj.files
+    assert eager.dumps() == obj.dumps()
+
+
+def test_lazy_segments_should_support_removal():
+    obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, lazy=True)
+
+    first_segment = obj.segments.pop(0)
+    obj.remove_segment(obj.segments[0])
+
+    assert 'https://priv.example.com/fileSequence2680.ts' == first_segment.uri
+    assert ['https://priv.example.com/fileSequence2682.ts'] == obj.segments.uri
+
+
+def test_lazy_segments_should_be_sliced_as_segments():
+    segments = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, lazy=True).segments
+
+    for sliced in (segments[0:2], segments.__getslice__(0, 2)):
+        assert isinstance(sliced, SegmentList)
+        assert segments.uri[:2] == [segment.uri for segment in sliced]
+
+
+def test_columnar_segments_should_behave_as_eager_segments():
+    content = playlists.PLAYLIST_WITH_MULTIPLE_KEYS_UNENCRYPTED_AND_ENCRYPTED
+    columnar = m3u8.M3U8(content, columnar=True)
+    eager = m3u8.M3U8(content)
+
+    assert isinstance(columnar.segments, ColumnarSegmentList)
+    assert eager.files == columnar.files
+    assert eager.dumps() == columnar.dumps()
+    assert eager.segments.total_duration == columnar.segments.total_duration
+    assert [s.uri for s in eager.segments[2:4]] == [s.uri for s in columnar.segments[2:4]]
+    assert [s.uri for s in eager.segments.by_key(eager.keys[1])] == \
+        [s.uri for s in columnar.segments.by_key(columnar.keys[1])]
+    assert columnar.segments[-1].key is columnar.keys[2]
+
+
+def test_columnar_segments_should_keep_segment_attributes():
+    obj = m3u8.M3U8(playlists.CUE_OUT_ELEMENTAL_PLAYLIST, columnar=True)
+    eager = m3u8.M3U8(playlists.CUE_OUT_ELEMENTAL_PLAYLIST)
+
+    for name in Segment.__slots__:
+        assert [getattr(s, name) for s in eager.segments] == \
+            [getattr(s, name) for s in obj.segments]
+
+    obj = m3u8.M3U8(playlists.DISCONTINUITY_PLAYLIST_WITH_PROGRAM_DATE_TIME, columnar=True)
+    eager = m3u8.M3U8(playlists.DISCONTINUITY_PLAYLIST_WITH_PROGRAM_DATE_TIME)
+
+    assert [s.program_date_time for s in eager.segments] == \
+        [s.program_date_time for s in obj.segments]
+    assert [s.discontinuity for s in eager.segments] == \
+        [s.discontinuity for s in obj.segments]
+
+
+def test_columnar_segments_should_be_views_of_the_rows():
+    obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, columnar=True)
+
+    segment = obj.segments[1]
+    assert segment is obj.segments[1]
+    segment.uri = 'changed.ts'
+    segment.discontinuity = True
+    assert 'changed.ts' == obj.segments.uri[1]
+    assert obj.segments[1].discontinuity
+
+    obj.segments.insert(0, Segment('first.ts', None, duration=1))
+    assert segment is obj.segments[2]
+    assert ['first.ts', 'https://priv.example.com/fileSequence2680.ts', 'changed.ts'] == \
+        obj.segments.uri[:3]
+
+
+def test_columnar_segments_should_support_removal():
+    obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, columnar=True)
+
+    first_segment = obj.segments.pop(0)
+    obj.remove_segment(obj.segments[0])
+    first_segment.title = 'removed'
+
+    assert 'https://priv.example.com/fileSequence2680.ts' == first_segment.uri
+    assert 'removed' == first_segment.title
+    assert ['https://priv.example.com/fileSequence2682.ts'] == obj.segments.uri
+
+
+def test_columnar_segments_should_match_added_segments_by_value():
+    obj = m3u8.M3U8(playlists.SIMPLE_PLAYLIST, columnar=True)
+    segment = Segment('added.ts', obj.base_uri, duration=4, title='')
+
+    obj.add_segment(segment)
+    assert segment in obj.segments
+    assert 1 == obj.segments.index(segment)
+
+    obj.remove_segment(segment)
+    assert ['http://media.example.com/entire.ts'] == obj.segments.uri
+
+
+def test_columnar_segments_should_update_base_uri():
+    obj = m3u8.M3U8(playlists.SIMPLE_PLAYLIST, base_uri='http://example.com/path',
+                    columnar=True)
+    obj.segments[0].base_uri = 'http://other.com/'
+    obj.base_uri = 'http://example.com/other/'
+
+    assert ['http://example.com/other/'] == [s.base_uri for s in obj.segments]
+
+
+def test_columnar_segments_slices_should_be_columnar():
+    content = playlists.PLAYLIST_WITH_MULTIPLE_KEYS_UNENCRYPTED_AND_ENCRYPTED
+    obj = m3u8.M3U8(content, columnar=True)
+    eager = m3u8.M3U8(content)
+
+    assert isinstance(obj.segments[2:6], ColumnarSegmentList)
+    assert str(SegmentList(eager.segments[2:6])) == str(obj.segments[2:6])
+    assert [s.uri for s in eager.segments[::3]] == obj.segments[::3].uri
+
+
+def test_columnar_segments_should_support_slices_without_step():
+    segments = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, columnar=True).segments
+    uris = segments.uri
+
+    assert uris[:2] == segments.__getslice__(0, 2).uri
+    segments.__setslice__(0, 1, [Segment('first.ts', None, duration=8)])
+    assert ['first.ts'] + uris[1:] == segments.uri
+    segments.__delslice__(1, 3)
+    assert ['first.ts'] == segments.uri
+
+
+def test_columnar_segments_should_be_pickled_as_segments():
+    obj = m3u8.M3U8(playlists.PLAYLIST_WITH_MULTIPLE_KEYS_UNENCRYPTED_AND_ENCRYPTED, columnar=True)
+
+    segments = pickle.loads(pickle.dumps(obj.segments))
+    assert isinstance(segments, ColumnarSegmentList)
+    assert str(obj.segments) == str(segments)
+    assert type(pickle.loads(pickle.dumps(obj.segments[0]))) is Segment
+
+
+def test_segments_to_arrays():
+    obj = m3u8.M3U8(playlists.DISCONTINUITY_PLAYLIST_WITH_PROGRAM_DATE_TIME)
+
+    for segments in (obj.segments, m3u8.M3U8(obj.dumps(), columnar=True).segments):
+        columns = segments.to_arrays(obj.media_sequence)
+        assert obj.segments.uri == columns['uri']
+        assert [s.duration for s in obj.segments] == list(columns['duration'])
+        assert [s.discontinuity for s in obj.segments] == [bool(d) for d in columns['discontinuity']]
+        assert list(range(obj.media_sequence, obj.media_sequence + len(obj.segments))) == \
+            list(columns['media_sequence'])
+        assert arrow.get(obj.segments[0].program_date_time).float_timestamp == \
+            columns['program_date_time'][0]
+
+
+def test_segments_should_be_created_from_arrays():
+    obj = m3u8.M3U8(playlists.DISCONTINUITY_PLAYLIST_WITH_PROGRAM_DATE_TIME)
+
+    for cls in (SegmentList, ColumnarSegmentList):
+        segments = cls.from_arrays(obj.segments.to_arrays(), base_uri=obj.base_uri)
+        assert isinstance(segments, cls)
+        assert str(obj.segments) == str(segments)
+        assert [s.program_date_time for s in obj.segments] == \
+            [s.program_date_time for s in segments]
+
+    segments = SegmentList.from_arrays({'uri': ['a.ts', 'b.ts'], 'duration': [2, 4]})
+    assert [None, None] == [s.program_date_time for s in segments]
+    assert 6 == segments.total_duration
+
+
+def test_segments_from_arrays_should_check_column_lengths():
+    with pytest.raises(ValueError):
+        SegmentList.from_arrays({'uri': ['a.ts', 'b.ts'], 'duration': [2]})
+
+
+def test_segments_to_numpy():
+    numpy = pytest.importorskip('numpy')
+    obj = m3u8.M3U8(playlists.DISCONTINUITY_PLAYLIST_WITH_PROGRAM_DATE_TIME)
+    obj.segments[1].program_date_time = None
+
+    columns = obj.segments.to_numpy(obj.media_sequence)
+    assert numpy.float64 == columns['duration'].dtype
+    assert bool == columns['discontinuity'].dtype
+    assert obj.media_sequence == columns['media_sequence'][0]
+    assert numpy.datetime64('2014-08-13T13:36:33', 'us') == columns['program_date_time'][0]
+    assert numpy.isnat(columns['program_date_time'][1])
+
+    segments = SegmentList.from_arrays(columns)
+    assert obj.segments[0].program_date_time == segments[0].program_date_time
+    assert segments[1].program_date_time is None
+    assert obj.segments.uri == segments.uri
+
+
+def test_segment_at_offset():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs)
+        segments = obj.segments
+
+        assert segments[0] is segments.segment_at(0)
+        assert segments[1] is segments.segment_at(8)
+        assert segments[2] is segments.segment_at(23.5)
+        assert segments.segment_at(-1) is None
+        assert segments.segment_at(24) is None
+
+
+def test_segments_range():
+    obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST)
+
+    assert obj.segments[:2] == obj.segments.range(4, 12)
+    assert obj.segments[1:2] == obj.segments.range(8, 16)
+    assert obj.segments[2:] == obj.segments.range(23.9, 100)
+    assert [] == obj.segments.range(24, 100)
+    assert isinstance(m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, columnar=True)
+                      .segments.range(0, 10), ColumnarSegmentList)
+
+
+def test_segment_at_datetime():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        obj = m3u8.M3U8(playlists.DISCONTINUITY_PLAYLIST_WITH_PROGRAM_DATE_TIME, **kwargs)
+        segments = obj.segments
+        start = segments[0].program_date_time
+
+        assert segments[1] is segments.segment_at_datetime(start + datetime.timedelta(seconds=4))
+        assert segments[5] is segments.segment_at_datetime(
+            arrow.get('2014-08-13T13:36:56+00:00').datetime)
+        assert segments.segment_at_datetime(start - datetime.timedelta(seconds=1)) is None
+        # between the end of g_50120.ts and the discontinuity
+        assert segments.segment_at_datetime(start + datetime.timedelta(seconds=16)) is None
+        assert segments[0] is segments.segment_at_datetime(datetime.datetime(2014, 8, 13, 13, 36, 33))
+
+
+def test_time_index_should_follow_added_and_removed_segments():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs)
+        assert obj.segments.segment_at(24) is None
+
+        obj.add_segment(Segment('fileSequence2683.ts', None, duration=8))
+        assert 'fileSequence2683.ts' == obj.segments.segment_at(24).uri
+
+        obj.remove_segment(obj.segments[0])
+        assert 'https://priv.example.com/fileSequence2681.ts' == obj.segments.segment_at(0).uri
+        assert 'fileSequence2683.ts' == obj.segments.segment_at(16).uri
+
+
+def test_time_index_should_be_rebuilt_after_in_place_changes_when_invalidated():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        segments = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs).segments
+        assert segments.segment_at(20).uri.endswith('fileSequence2682.ts')
+
+        segments[0].duration = 16
+        # the index is not rebuilt on its own, whatever the kind of list
+        assert segments.segment_at(20).uri.endswith('fileSequence2682.ts')
+
+        segments.invalidate_time_index()
+        assert segments.segment_at(20).uri.endswith('fileSequence2681.ts')
+        assert segments.segment_at(31).uri.endswith('fileSequence2682.ts')
+
+
+def test_segments_should_be_numbered_by_media_sequence():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        segments = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs).segments
+
+        assert 2680 == segments.media_sequence
+        assert segments[1] is segments.by_sequence(2681)
+        assert 2681 == segments.media_sequence_of(segments[1])
+        assert segments.by_sequence(2679) is None
+        assert segments.by_sequence(2683) is None
+        assert segments.uri[1:] == [s.uri for s in segments.sequence_range(2681, 2683)]
+        assert segments.uri[2:] == [s.uri for s in segments.sequence_range(2682)]
+        assert [] == segments.sequence_range(2683)
+        assert 2680 == pickle.loads(pickle.dumps(segments)).media_sequence
+
+
+def test_segments_without_media_sequence_should_be_numbered_from_zero():
+    segments = SegmentList([Segment('a.ts', None, duration=1)])
+
+    assert segments.media_sequence is None
+    assert segments[0] is segments.by_sequence(0)
+    assert 0 == segments.media_sequence_of(segments[0])
+
+
+def test_removing_segment_should_renumber_following_segments():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs)
+        obj.remove_segment(obj.segments[1])
+
+        assert 2680 == obj.media_sequence
+        assert 2681 == obj.segments[1].media_sequence
+        assert obj.segments.by_sequence(2681).uri.endswith('fileSequence2682.ts')
+        assert obj.segments.by_sequence(2682) is None
+
+
+def test_removing_first_segments_should_move_media_sequence_on():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs)
+        last = obj.segments[2]
+        obj.remove_segment(obj.segments[0])
+        del obj.segments[0]
+
+        assert 2682 == obj.media_sequence
+        assert 2682 == obj.segments.media_sequence
+        assert 2682 == last.media_sequence
+        assert last is obj.segments.by_sequence(2682)
+        assert '#EXT-X-MEDIA-SEQUENCE:2682' in obj.dumps()
+
+
+def test_removing_first_segment_should_write_media_sequence():
+    obj = m3u8.M3U8(playlists.SIMPLE_PLAYLIST)
+    obj.add_segment(Segment('next.ts', None, duration=1))
+    obj.remove_segment(obj.segments[0])
+
+    assert 1 == obj.segments[0].media_sequence
+    assert '#EXT-X-MEDIA-SEQUENCE:1' in obj.dumps()
+
+
+def test_inserting_before_first_segment_should_keep_numbers():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs)
+        first = obj.segments[0]
+        obj.segments.insert(0, Segment('previous.ts', None, duration=1))
+
+        assert 2679 == obj.media_sequence
+        assert 2679 == obj.segments[0].media_sequence
+        assert 2680 == first.media_sequence
+
+
+def test_setting_playlist_media_sequence_should_renumber_segments():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs)
+        obj.media_sequence = 100
+
+        assert 100 == obj.segments.media_sequence
+        assert [100, 101, 102] == [segment.media_sequence for segment in obj.segments]
+        assert obj.segments[1] is obj.segments.by_sequence(101)
+
+
+def test_sequence_range_should_return_segment_list():
+    for kwargs in ({}, {'lazy': True}, {'columnar': True}):
+        segments = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST, **kwargs).segments
+        segments_range = segments.sequence_range(2681)
+
+        assert SegmentList is type(segments_range)
+        assert 2681 == segments_range.media_sequence
+        assert [2681, 2682] == [segment.media_sequence for segment in segments_range]
+
+
+def test_segments_from_another_list_should_keep_their_numbers():
+    obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST)
+    segments = SegmentList(obj.segments[1:])
+
+    assert 2681 == segments.media_sequence
+    assert 2681 == segments.media_sequence_of(obj.segments[1])
+    assert 2681 == obj.segments.media_sequence_of(obj.segments[1])
+
+
+def test_reassigning_segments_should_set_playlist_media_sequence():
+    obj = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST)
+    obj.segments = SegmentList(obj.segments[1:])
+
+    assert 2681 == obj.media_sequence
+    assert '#EXT-X-MEDIA-SEQUENCE:2681' in obj.dumps()
+
+
+def test_segments_from_arrays_should_keep_media_sequence():
+    segments = m3u8.M3U8(playlists.SLIDING_WINDOW_PLAYLIST).segments
+    copy = SegmentList.from_arrays(segments.to_arrays())
+
+    assert 2680 == copy.media_sequence
+    assert 2682 == copy.to_arrays()['media_sequence'][-1]
+
+
 # custom asserts
 
 def assert_file_content(filename, expected):
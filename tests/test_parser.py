@@ -251,3 +251,137 @@ def test_commaless_extinf_strict():
     with pytest.raises(ParseError) as e:
         m3u8.parse(playlists.SIMPLE_PLAYLIST_COMMALESS_EXTINF, strict=True)
     assert str(e.value) == 'Syntax error in manifest on line 3: #EXTINF:5220'
+
+def test_should_match_tags_by_exact_name():
+    data = m3u8.parse(playlists.PLAYLIST_WITH_DISCONTINUITY_SEQUENCE)
+    assert [False, True] == [c['discontinuity'] for c in data['segments']]
+
+def test_iterparse_should_yield_segments_and_keys():
+    events = list(m3u8.iterparse(playlists.PLAYLIST_WITH_ENCRIPTED_SEGMENTS_AND_IV_WITH_MULTIPLE_KEYS))
+    data = m3u8.parse(playlists.PLAYLIST_WITH_ENCRIPTED_SEGMENTS_AND_IV_WITH_MULTIPLE_KEYS)
+    assert data['segments'] == [value for event, value in events if event == 'segment']
+    assert data['keys'] == [value for event, value in events if event == 'key']
+    assert 'playlist' == events[-1][0]
+    assert data['media_sequence'] == events[-1][1]['media_sequence']
+    assert data['targetduration'] == events[-1][1]['targetduration']
+
+def test_iterparse_should_yield_repeated_keys_once():
+    key = '#EXT-X-KEY:METHOD=AES-128,URI="/hls-key/key.bin"\n'
+    content = '#EXTM3U\n' + (key + '#EXTINF:10,\nsegment.ts\n') * 2
+    events = list(m3u8.iterparse(content))
+    assert m3u8.parse(content)['keys'] == [value for event, value in events if event == 'key']
+    assert 2 == len([value for event, value in events if event == 'segment'])
+
+def test_iterparse_should_yield_variants_and_media():
+    events = list(m3u8.iterparse(playlists.MULTI_MEDIA_PLAYLIST))
+    assert ['media'] * 4 + ['variant'] * 3 + ['playlist'] == [event for event, value in events]
+    assert '448/chunklist_w370587926_b688000_vo_slen_t64TWFpbg==.m3u8' == events[-2][1]['uri']
+    assert events[-1][1]['is_variant']
+
+def test_iterparse_should_read_binary_file_objects():
+    with open(playlists.SIMPLE_PLAYLIST_FILENAME, 'rb') as fileobj:
+        events = list(m3u8.iterparse(fileobj))
+    assert [('segment', 'http://media.example.com/entire.ts')] == \
+        [(event, value['uri']) for event, value in events if event == 'segment']
+
+def test_iterparse_should_join_lines_split_across_chunks():
+    content = playlists.SIMPLE_PLAYLIST_WITH_TITLE.encode('utf-8')
+    chunks = [content[i:i + 7] for i in range(0, len(content), 7)]
+    segments = [value for event, value in m3u8.iterparse(chunks) if event == 'segment']
+    assert m3u8.parse(playlists.SIMPLE_PLAYLIST_WITH_TITLE)['segments'] == segments
+
+def test_iterparse_should_read_text_and_bytes_alike():
+    content = playlists.SIMPLE_PLAYLIST_WITH_TITLE
+    assert list(m3u8.iterparse(content)) == list(m3u8.iterparse(content.encode('utf-8')))
+
+def test_iterparse_strict_should_report_line_numbers():
+    with pytest.raises(ParseError) as catch:
+        list(m3u8.iterparse(playlists.SIMPLE_PLAYLIST_MESSY, strict=True))
+    assert str(catch.value) == 'Syntax error in manifest on line 5: JUNK'
+
+def test_parse_header_should_read_playlist_level_data():
+    data = m3u8.parser.parse_header(playlists.SIMPLE_PLAYLIST_WITH_VOD_PLAYLIST_TYPE)
+    assert 'vod' == data['playlist_type']
+    assert data['is_endlist']
+    assert 0 == data['media_sequence']
+
+def test_parse_header_should_count_segments_and_duration():
+    data = m3u8.parser.parse_header(playlists.SLIDING_WINDOW_PLAYLIST)
+    assert 8 == data['targetduration']
+    assert 2680 == data['media_sequence']
+    assert not data['is_endlist']
+    assert 3 == data['segment_count']
+    assert 24 == data['total_duration']
+
+def test_parse_header_should_match_parse_for_variant_playlists():
+    data = m3u8.parser.parse_header(playlists.VARIANT_PLAYLIST)
+    assert data['is_variant']
+    assert None == data['media_sequence']
+    assert 0 == data['segment_count']
+
+def test_parse_tail_should_keep_only_the_last_segments():
+    data = m3u8.parser.parse_tail(playlists.SIMPLE_PLAYLIST_WITH_PROGRAM_DATE_TIME, 2)
+    assert ['g_50122.ts', 'g_50123.ts'] == [c['uri'] for c in data['segments']]
+    assert 50122 == data['media_sequence']
+    assert 3 == data['targetduration']
+
+def test_parse_tail_should_compute_program_date_time_of_kept_segments():
+    data = m3u8.parser.parse_tail(playlists.SIMPLE_PLAYLIST_WITH_PROGRAM_DATE_TIME, 2)
+    assert cast_date_time('2014-08-13T13:36:33+00:00') == data['program_date_time']
+    assert cast_date_time('2014-08-13T13:36:51+00:00') == data['segments'][0]['program_date_time']
+
+def test_parse_tail_should_restore_key_and_cue_state():
+    content = playlists.PLAYLIST_WITH_MULTIPLE_KEYS_UNENCRYPTED_AND_ENCRYPTED
+    data = m3u8.parser.parse_tail(content, 3)
+    assert m3u8.parse(content)['segments'][-3:] == data['segments']
+    assert 2 == len(data['keys'])
+
+    content = playlists.CUE_OUT_ELEMENTAL_PLAYLIST
+    data = m3u8.parser.parse_tail(content, 1)
+    assert m3u8.parse(content)['segments'][-1:] == data['segments']
+    assert '50' == data['segments'][0]['scte35_duration']
+
+def test_parse_tail_should_parse_everything_if_there_are_not_enough_segments():
+    assert m3u8.parse(playlists.SLIDING_WINDOW_PLAYLIST) == \
+        m3u8.parser.parse_tail(playlists.SLIDING_WINDOW_PLAYLIST, 10)
+
+def test_should_parse_quoted_attribute_values_with_separators():
+    data = m3u8.parse('#EXTM3U\n'
+                      '#EXT-X-KEY:METHOD=AES-128, URI="https://k.example.com/?a=1,b=2",IV=0X12A\n'
+                      '#EXTINF:10,\n'
+                      'segment.ts\n')
+    assert {'method': 'AES-128', 'uri': 'https://k.example.com/?a=1,b=2', 'iv': '0X12A'} == data['keys'][0]
+
+def test_cast_date_time_should_match_iso8601():
+    import iso8601
+    for value in ('2014-08-13T13:36:33.123456789+02:00',
+                  '2014-08-13T13:36:33Z',
+                  '2014-08-13T13:36:33.5-0300',
+                  '2014-08-13 13:36'):
+        assert iso8601.parse_date(value) == cast_date_time(value)
+        assert iso8601.parse_date(value).utcoffset() == cast_date_time(value).utcoffset()
+
+def test_should_keep_commas_of_extinf_titles():
+    data = m3u8.parse('#EXTM3U\n'
+                      '#EXTINF:10.5,Artist, Title\n'
+                      'segment.ts\n')
+    assert 10.5 == data['segments'][0]['duration']
+    assert 'Artist, Title' == data['segments'][0]['title']
+
+def test_should_parse_utf8_buffers_as_strings():
+    content = playlists.SIMPLE_PLAYLIST_WITH_TITLE
+    assert m3u8.parse(content) == m3u8.parse(content.encode('utf-8'))
+    assert m3u8.parse(content) == m3u8.parse(bytearray(content.encode('utf-8')))
+    assert m3u8.parse(content) == m3u8.parse(memoryview(content.encode('utf-8')))
+
+def test_should_parse_non_ascii_text():
+    content = u'#EXTM3U\n#EXTINF:1,Caf\xe9\nsegment.ts\n'
+    assert u'Caf\xe9' == m3u8.parse(content)['segments'][0]['title']
+    assert u'Caf\xe9' == m3u8.parser.parse_tail(content, 1)['segments'][0]['title']
+    assert m3u8.parse(content) == m3u8.parser.parse_tail(memoryview(content.encode('utf-8')), 1)
+
+def test_buffer_to_lines_should_split_lines_like_text_mode_files():
+    content = b'\n #EXTM3U\r\n#EXTINF:10,\r\ra.ts\n\nb\n \n'
+    expected = ['#EXTM3U', '#EXTINF:10,', '', 'a.ts', '', 'b']
+    assert expected == list(m3u8.parser.buffer_to_lines(content))
+    assert expected == list(m3u8.parser.buffer_to_lines(content, chunk_size=3))